@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+from kubernetes.client.rest import ApiException
+from kubernetes.dynamic import DynamicClient
+import json
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Владелец полей при server-side apply
+FIELD_MANAGER = "mysql-operator"
+
+APPLY_CONTENT_TYPE = "application/apply-patch+yaml"
+
+# (apiVersion, kind) -> (plural, namespaced)
+RESOURCES = {
+    ("v1", "Secret"): ("secrets", True),
+    ("v1", "ConfigMap"): ("configmaps", True),
+    ("v1", "Service"): ("services", True),
+    ("v1", "PersistentVolumeClaim"): ("persistentvolumeclaims", True),
+    ("v1", "PersistentVolume"): ("persistentvolumes", False),
+    ("apps/v1", "Deployment"): ("deployments", True),
+    ("apps/v1", "StatefulSet"): ("statefulsets", True),
+}
+
+
+def collection_path(api_version, plural, namespace=None):
+    """URL коллекции: в namespace или во всем кластере"""
+    prefix = "/api/v1" if api_version == "v1" else f"/apis/{api_version}"
+    if namespace:
+        return f"{prefix}/namespaces/{namespace}/{plural}"
+    return f"{prefix}/{plural}"
+
+
+def resource_path(manifest):
+    """URL объекта в API сервере по apiVersion/kind/metadata манифеста"""
+    api_version = manifest['apiVersion']
+    plural, namespaced = RESOURCES[(api_version, manifest['kind'])]
+    metadata = manifest['metadata']
+    namespace = metadata['namespace'] if namespaced else None
+    return f"{collection_path(api_version, plural, namespace)}/{metadata['name']}"
+
+
+def lister(dynamic_client, api_version, plural):
+    """list/watch функция коллекции для Informer.
+
+    Замена list_*_for_all_namespaces/list_namespaced_* из CoreV1Api и
+    AppsV1Api: те же параметры (namespace, limit, _continue, label_selector,
+    watch...), ответ - сырой JSON. Сгенерированные *Api при первом
+    обращении импортируют сотни классов моделей - это большая часть
+    времени запуска оператора, а модели Informer не нужны.
+    """
+    def list_objects(namespace=None, **params):
+        return dynamic_client.request(
+            'get', collection_path(api_version, plural, namespace), serialize=False, **params
+        )
+    return list_objects
+
+
+class _NoDiscovery:
+    """Пустой discoverer: пути строятся по RESOURCES, discovery API не нужен"""
+
+    def __init__(self, client, cache_file):
+        pass
+
+
+class ApplyEngine:
+    """Server-side apply: один PATCH на манифест, создание или обновление.
+
+    Запрос идемпотентен, поэтому цепочка create -> 409 -> get -> replace не
+    нужна. force=True забирает владение полями у других менеджеров (например,
+    у объектов, созданных до перехода на apply).
+    """
+
+    def __init__(self, api_client, field_manager=FIELD_MANAGER, force=True):
+        self.client = DynamicClient(api_client, discoverer=_NoDiscovery)
+        self.field_manager = field_manager
+        self.force = force
+
+    def apply(self, manifest):
+        """Применение манифеста, возвращает объект из ответа API сервера"""
+        plural, _ = RESOURCES[(manifest['apiVersion'], manifest['kind'])]
+        with metrics.api_call("apply", plural):
+            response = self.client.request(
+                'patch',
+                resource_path(manifest),
+                body=json.dumps(manifest),
+                content_type=APPLY_CONTENT_TYPE,
+                field_manager=self.field_manager,
+                force_conflicts=self.force,
+                serialize=False
+            )
+        return json.loads(response.data)
+
+    def delete(self, manifest):
+        """Удаление объекта манифеста; отсутствующий объект - не ошибка"""
+        plural, _ = RESOURCES[(manifest['apiVersion'], manifest['kind'])]
+        try:
+            with metrics.api_call("delete", plural):
+                self.client.request('delete', resource_path(manifest), serialize=False)
+        except ApiException as e:
+            if e.status != 404:
+                raise
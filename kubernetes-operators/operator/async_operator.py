@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+
+from kubernetes_asyncio import client, config, watch
+from kubernetes_asyncio.client.rest import ApiException
+from kubernetes_asyncio.dynamic import DynamicClient
+import asyncio
+import json
+import logging
+import random
+import time
+
+import logs
+import metrics
+from apply import APPLY_CONTENT_TYPE, FIELD_MANAGER, RESOURCES, resource_path
+from bulk import STAGES
+from debug import DebugServer
+from readiness import workload_ready
+from manifests import LABEL_SELECTOR, SPEC_HASH_ANNOTATION, ManifestRenderer, workload_kind
+from workqueue import TokenBucket
+from status import PHASE_FAILED, PHASE_PROVISIONING, PHASE_READY, StatusWriter, endpoints, error_message, needs_reconcile
+
+logs.setup_from_env()
+logger = logging.getLogger(__name__)
+
+# Экспоненциальный backoff повтора CR после ошибки, как в RateLimitingQueue
+RETRY_BASE_DELAY = 0.005
+RETRY_MAX_DELAY = 300
+
+
+class ThrottledApiClient(client.ApiClient):
+    """ApiClient с общим лимитом запросов (ожидание токена не блокирует event loop)"""
+
+    def __init__(self, configuration, qps, burst):
+        super().__init__(configuration)
+        self.bucket = TokenBucket(qps, burst)
+
+    async def call_api(self, *args, **kwargs):
+        delay = self.bucket.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await super().call_api(*args, **kwargs)
+
+
+class AsyncMySQLOperator:
+    """Асинхронный вариант MySQLOperator на kubernetes_asyncio.
+
+    Все запросы идут через один ApiClient с ограниченным keep-alive пулом
+    соединений (pool_size). Разные CR обрабатываются конкурентно, не более
+    concurrency одновременно и не более одного reconcile на CR.
+
+    Готовность (phase, условие Ready) - по watch Deployment/StatefulSet с
+    LABEL_SELECTOR: смена готовности ставит CR в очередь.
+    """
+
+    def __init__(self, concurrency=16, pool_size=32, metrics_port=8000, overlays=None,
+                 debug_port=0, debug_address="127.0.0.1", api_qps=0, api_burst=100):
+        self.concurrency = concurrency
+        self.pool_size = pool_size
+        self.metrics_port = metrics_port
+        # Отладочный endpoint в отдельном потоке; 0 - выключен
+        self.debug_port = debug_port
+        self.debug_address = debug_address
+        # Общий лимит запросов к API серверу; 0 - без ограничения
+        self.api_qps = api_qps
+        self.api_burst = api_burst
+
+        self.group = "otus.homework"
+        self.version = "v1"
+        self.plural = "mysqls"
+
+        # Последнее необработанное событие по ключу namespace/name
+        self.pending = {}
+        self.running = set()
+        self.tasks = set()
+        # Число ошибок подряд по ключу; сбрасывается успехом или удалением CR
+        self.failures = {}
+        # spec-hash последнего успешного apply: (namespace, CR) -> {(kind, name): hash}
+        self.applied = {}
+        # Манифесты CR кэшируются до изменения generation
+        self.renderer = ManifestRenderer(overlays)
+        # Последняя версия каждого CR из watch (в том числе после записи status)
+        self.crs = {}
+        # Готовность Deployment/StatefulSet CR по watch: ключ -> bool
+        self.ready = {}
+        # Состояние watch по kind: resourceVersion, время (monotonic) начала и последнего события
+        self.watches = {}
+
+    async def connect(self):
+        """Загрузка конфигурации и создание общего ApiClient"""
+        try:
+            config.load_incluster_config()  # Для работы внутри кластера
+        except Exception:
+            await config.load_kube_config()  # Для локальной разработки
+
+        configuration = client.Configuration.get_default_copy()
+        configuration.connection_pool_maxsize = self.pool_size
+
+        if self.api_qps:
+            self.api_client = ThrottledApiClient(configuration, self.api_qps, self.api_burst)
+        else:
+            self.api_client = client.ApiClient(configuration)
+        self.v1 = client.CoreV1Api(self.api_client)
+        self.apps_v1 = client.AppsV1Api(self.api_client)
+        self.custom_api = client.CustomObjectsApi(self.api_client)
+        # Используется только request() с готовыми путями, discovery не нужен
+        self.dynamic = DynamicClient(self.api_client)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def apply(self, manifest):
+        """Server-side apply манифеста, если он изменился с прошлого apply.
+
+        Возвращает объект из ответа API или None, если apply не понадобился.
+        """
+        metadata = manifest['metadata']
+        applied = self.applied.setdefault((metadata['namespace'], metadata['labels']['instance']), {})
+        key = (manifest['kind'], metadata['name'])
+        digest = metadata['annotations'][SPEC_HASH_ANNOTATION]
+        if applied.get(key) == digest:
+            return None
+
+        plural, _ = RESOURCES[(manifest['apiVersion'], manifest['kind'])]
+        with metrics.api_call("apply", plural):
+            response = await self.dynamic.request(
+                'patch',
+                resource_path(manifest),
+                body=manifest,
+                content_type=APPLY_CONTENT_TYPE,
+                field_manager=FIELD_MANAGER,
+                force_conflicts=True,
+                serialize=False
+            )
+            data = await response.read()
+            # Без десериализации DynamicClient не проверяет код ответа
+            if response.status >= 400:
+                error = ApiException(status=response.status, reason=response.reason)
+                error.body = data
+                raise error
+        applied[key] = digest
+        logger.info(f"{manifest['kind']} {metadata['name']} applied")
+        return json.loads(data)
+
+    async def sync_mysql(self, name, namespace, spec, owner=None):
+        """Приведение дочерних объектов CR к spec"""
+        manifests = self.renderer.render_all(name, namespace, spec, owner)
+
+        # Объекты одного этапа независимы друг от друга - один RTT на этап
+        for kinds in STAGES:
+            stage = [manifest for manifest in manifests if manifest['kind'] in kinds]
+            await asyncio.gather(*map(self.apply, stage))
+
+        logger.info(f"Successfully reconciled resources for MySQL CR: {name}")
+
+    def forget_resources(self, name, namespace, uid=None):
+        """Сброс запомненных hash и манифестов удаленного CR"""
+        self.applied.pop((namespace, name), None)
+        self.renderer.forget(uid)
+
+    async def handle_mysql_cr(self, event):
+        """Обработка событий MySQL Custom Resource"""
+        obj = event['object']
+        metadata = obj.get('metadata', {})
+        name = metadata.get('name')
+        namespace = metadata.get('namespace', 'default')
+        key = cr_key(obj)
+
+        with logs.reconcile_context(f"{namespace}/{name}", event['type']), metrics.ReconcileTimer() as timer:
+            logger.info(f"Processing MySQL CR: {name} in namespace {namespace}")
+            if event['type'] == 'ADDED' or event['type'] == 'MODIFIED':
+                # Все изменения status за reconcile - одним patch в конце
+                status = StatusWriter(obj)
+                status.set(observedGeneration=metadata.get('generation'))
+                failed = False
+                try:
+                    await self.sync_mysql(name, namespace, obj.get('spec', {}), obj)
+                except ValueError as e:
+                    # Ошибка в spec: повтор не поможет, следующий reconcile - по изменению CR
+                    logger.error(f"Invalid spec of MySQL CR {name}: {e}")
+                    timer.outcome = "error"
+                    status.set(phase=PHASE_FAILED)
+                    status.set_condition("Synced", "False", "InvalidSpec", error_message(e))
+                except Exception as e:
+                    failed = True
+                    logger.error(f"Error creating resources for {name}: {e}")
+                    status.set(phase=PHASE_FAILED)
+                    status.set_condition("Synced", "False", "ApplyFailed", error_message(e))
+                else:
+                    status.set(**endpoints(name, namespace, obj.get('spec', {})))
+                    status.set_condition("Synced", "True", "ResourcesApplied")
+                    # Ответ apply нового объекта всегда без readyReplicas - готовность по watch
+                    ready = self.ready.get(key, False)
+                    kind = workload_kind(obj.get('spec', {}))
+                    status.set(phase=PHASE_READY if ready else PHASE_PROVISIONING)
+                    status.set_condition(
+                        "Ready",
+                        "True" if ready else "False",
+                        f"{kind}Ready" if ready else f"{kind}NotReady"
+                    )
+                try:
+                    await self.write_status(status)
+                except ApiException as e:
+                    failed = True
+                    logger.error(f"Error updating status of {name}: {e}")
+
+                # Как в RateLimitingQueue: повтор с backoff, успех сбрасывает счетчик
+                if failed:
+                    timer.outcome = "error"
+                    self.retry(key, event)
+                else:
+                    self.failures.pop(key, None)
+
+            elif event['type'] == 'DELETED':
+                # Дочерние объекты удаляет сборщик мусора по ownerReferences
+                self.forget_resources(name, namespace, metadata.get('uid'))
+                self.failures.pop(key, None)
+                self.ready.pop(key, None)
+                timer.outcome = "deleted"
+                logger.info(f"MySQL CR {name} deleted, dependents are garbage collected")
+
+    async def write_status(self, status):
+        """Запись status CR одним merge patch, если он изменился (ошибки, кроме 404, пробрасываются)"""
+        changed = status.patch()
+        if not changed:
+            return
+        try:
+            with metrics.api_call("patch", f"{self.plural}/status"):
+                await self.custom_api.patch_namespaced_custom_object_status(
+                    group=self.group,
+                    version=self.version,
+                    namespace=status.namespace,
+                    plural=self.plural,
+                    name=status.name,
+                    body={"status": changed}
+                )
+        except ApiException as e:
+            # CR удален во время reconcile - status писать некуда
+            if e.status != 404:
+                raise
+
+    async def _drain(self, key):
+        """Обработка событий одного CR по очереди, только последнее событие"""
+        try:
+            while key in self.pending:
+                event = self.pending.pop(key)
+                async with self.semaphore:
+                    await self.handle_mysql_cr(event)
+        finally:
+            self.running.discard(key)
+
+    def retry(self, key, event):
+        """Повтор события после ошибки с экспоненциальной задержкой по ключу"""
+        failures = self.failures.get(key, 0) + 1
+        self.failures[key] = failures
+        delay = min(RETRY_BASE_DELAY * 2 ** (failures - 1), RETRY_MAX_DELAY)
+        logger.info(f"Retrying {key} in {delay:.3f}s, attempt #{failures}")
+        asyncio.get_running_loop().call_later(delay, self._retry, key, event, failures)
+
+    def _retry(self, key, event, failures):
+        # После этой ошибки был успех, удаление или новая ошибка со своим
+        # повтором; более новое событие в очереди заменять нельзя
+        if self.failures.get(key) != failures or key in self.pending or key not in self.crs:
+            return
+        # status за это время мог измениться - повтор по последней версии CR
+        self.enqueue({'type': event['type'], 'object': self.crs[key]})
+
+    def enqueue(self, event):
+        key = cr_key(event['object'])
+        self.pending[key] = event
+        if key in self.running:
+            return
+
+        self.running.add(key)
+        task = asyncio.create_task(self._drain(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def on_mysql(self, event):
+        """Событие watch MySQL CR"""
+        obj = event['object']
+        key = cr_key(obj)
+        if event['type'] == 'DELETED':
+            self.crs.pop(key, None)
+        else:
+            previous = self.crs.get(key)
+            self.crs[key] = obj
+            # list после 410 присылает ADDED и для CR, не менявшихся с прошлого события
+            if previous is not None and previous['metadata'].get('resourceVersion') == obj['metadata'].get('resourceVersion'):
+                return
+        # Запись status (в том числе нашим reconcile) не меняет generation
+        if needs_reconcile(event['type'], obj):
+            self.enqueue(event)
+
+    def on_workload(self, event):
+        """Событие watch Deployment/StatefulSet: CR в очередь при смене готовности"""
+        obj = event['raw_object']
+        instance = (obj['metadata'].get('labels') or {}).get('instance')
+        if instance is None:
+            return
+        key = f"{obj['metadata'].get('namespace')}/{instance}"
+        ready = event['type'] != 'DELETED' and workload_ready(obj)
+        # Нет данных - то же, что не готов (так считает handle_mysql_cr)
+        changed = self.ready.get(key, False) != ready
+        self.ready[key] = ready
+        if not changed:
+            return
+        # Apply не нужен (spec-hash тот же) - reconcile только обновит status
+        if key in self.crs and key not in self.pending:
+            self.enqueue({'type': 'MODIFIED', 'object': self.crs[key]})
+
+    def _debug_sources(self):
+        """Разделы /debug/state; читаются из потока сервера копированием"""
+        def age(moment):
+            return None if moment is None else round(time.monotonic() - moment, 3)
+
+        return {
+            "queue": lambda: {"pending": sorted(self.pending), "running": sorted(self.running)},
+            "reconciles": logs.active_reconciles,
+            "watches": lambda: [{
+                "kind": kind,
+                "resource_version": state['resource_version'],
+                "watch_age_seconds": age(state['started_at']),
+                "last_event_age_seconds": age(state['event_at']),
+            } for kind, state in list(self.watches.items())],
+        }
+
+    async def watch(self, kind, list_func, handler, **params):
+        """Бесконечный watch с продолжением с последней resourceVersion"""
+        state = self.watches[kind] = {"resource_version": None, "started_at": None, "event_at": None}
+        failures = 0
+
+        while True:
+            try:
+                w = watch.Watch()
+                state['started_at'] = time.monotonic()
+                async with w.stream(
+                    list_func,
+                    resource_version=state['resource_version'],
+                    allow_watch_bookmarks=True,
+                    timeout_seconds=300,
+                    **params
+                ) as stream:
+                    async for event in stream:
+                        metadata = event['raw_object'].get('metadata', {})
+                        state['resource_version'] = metadata.get('resourceVersion', state['resource_version'])
+                        state['event_at'] = time.monotonic()
+                        if event['type'] == 'BOOKMARK':
+                            continue
+                        metrics.observe_event(kind, event['type'])
+                        handler(event)
+
+                metrics.WATCH_RESTARTS.labels(kind, "timeout").inc()
+                failures = 0
+
+            except ApiException as e:
+                if e.status == 410:  # resourceVersion устарела - нужен полный list
+                    logger.info(f"{kind} resourceVersion expired, restarting watch from scratch")
+                    metrics.WATCH_RESTARTS.labels(kind, "gone").inc()
+                    state['resource_version'] = None
+                    continue
+                metrics.WATCH_RESTARTS.labels(kind, "error").inc()
+                logger.error(f"{kind} watch API exception: {e}")
+                await asyncio.sleep(random.uniform(0, min(30, 0.5 * 2 ** failures)))
+                failures += 1
+            except Exception as e:
+                metrics.WATCH_RESTARTS.labels(kind, "error").inc()
+                logger.error(f"Unexpected error in {kind} watch: {e}")
+                await asyncio.sleep(random.uniform(0, min(30, 0.5 * 2 ** failures)))
+                failures += 1
+
+    async def run(self):
+        """Запуск оператора"""
+        logger.info("Starting async MySQL Operator...")
+        metrics.start_metrics_server(self.metrics_port)
+        if self.debug_port:
+            DebugServer(self.debug_port, self._debug_sources(), self.debug_address).start()
+        await self.connect()
+
+        await asyncio.gather(
+            self.watch(
+                "MySQL", self.custom_api.list_cluster_custom_object, self.on_mysql,
+                group=self.group, version=self.version, plural=self.plural
+            ),
+            self.watch(
+                "Deployment", self.apps_v1.list_deployment_for_all_namespaces, self.on_workload,
+                label_selector=LABEL_SELECTOR
+            ),
+            self.watch(
+                "StatefulSet", self.apps_v1.list_stateful_set_for_all_namespaces, self.on_workload,
+                label_selector=LABEL_SELECTOR
+            ),
+        )
+
+
+def cr_key(obj):
+    """Ключ namespace/name CR"""
+    metadata = obj['metadata']
+    return f"{metadata.get('namespace')}/{metadata['name']}"
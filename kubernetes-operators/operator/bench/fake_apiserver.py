@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import copy
+import itertools
+import json
+import random
+import re
+import threading
+import time
+
+# /api/v1[/namespaces/{ns}]/{plural}[/{name}[/{subresource}]] и то же для /apis/{group}/{version}
+PATH_RE = re.compile(
+    r"^/(?:api/v1|apis/[^/]+/[^/]+)(?:/namespaces/(?P<namespace>[^/]+))?"
+    r"/(?P<plural>[^/]+)(?:/(?P<name>[^/]+))?(?:/(?P<subresource>[^/]+))?$"
+)
+
+
+class FakeApiError(Exception):
+    def __init__(self, code, reason):
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+
+
+class Faults:
+    """Настройки искажений: задержка и доля ошибок"""
+
+    def __init__(self, latency=0.0, conflict_rate=0.0, not_found_rate=0.0, gone_rate=0.0):
+        self.latency = latency
+        self.conflict_rate = conflict_rate
+        self.not_found_rate = not_found_rate
+        self.gone_rate = gone_rate
+
+
+def match_labels(obj, selector):
+    """Поддержка селекторов k=v, k==v, k!=v и k (существование)"""
+    if not selector:
+        return True
+    labels = obj.get('metadata', {}).get('labels') or {}
+    for term in selector.split(','):
+        term = term.strip()
+        if '!=' in term:
+            key, value = term.split('!=', 1)
+            if labels.get(key) == value:
+                return False
+        elif '=' in term:
+            key, value = term.replace('==', '=').split('=', 1)
+            if labels.get(key) != value:
+                return False
+        elif term not in labels:
+            return False
+    return True
+
+
+def merge(target, patch):
+    """JSON merge patch (RFC 7386); списки заменяются целиком"""
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+    return target
+
+
+class FakeState:
+    """Хранилище объектов с историей событий для watch.
+
+    История ограничена history событиями: watch с более старой
+    resourceVersion получает 410 Gone, как после компакции etcd.
+    """
+
+    def __init__(self, history=100000):
+        self.cond = threading.Condition()
+        self.rv = 0
+        self.objects = {}
+        self.events = deque(maxlen=history)
+        self.compacted_rv = 0
+        self.watch_epoch = 0
+        self.active_watches = 0
+        self.calls = Counter()
+        # uid владельца -> {(plural, key)} зависимых объектов
+        self._dependents = {}
+        self._uids = itertools.count(1)
+
+    def _key(self, namespace, name):
+        return f"{namespace}/{name}" if namespace else name
+
+    def _store(self, plural):
+        return self.objects.setdefault(plural, {})
+
+    def _emit(self, plural, event_type, obj):
+        if len(self.events) == self.events.maxlen:
+            self.compacted_rv = self.events[0][0]
+        self.events.append((self.rv, plural, event_type, copy.deepcopy(obj)))
+        self.cond.notify_all()
+
+    def _stamp(self, obj):
+        self.rv += 1
+        obj['metadata']['resourceVersion'] = str(self.rv)
+
+    def list(self, plural, namespace=None, selector=None):
+        with self.cond:
+            items = [
+                copy.deepcopy(obj)
+                for obj in self._store(plural).values()
+                if (namespace is None or obj['metadata'].get('namespace') == namespace)
+                and match_labels(obj, selector)
+            ]
+            return items, str(self.rv)
+
+    def get(self, plural, namespace, name):
+        with self.cond:
+            obj = self._store(plural).get(self._key(namespace, name))
+            if obj is None:
+                raise FakeApiError(404, "NotFound")
+            return copy.deepcopy(obj)
+
+    def create(self, plural, namespace, obj):
+        obj = copy.deepcopy(obj)
+        metadata = obj.setdefault('metadata', {})
+        if namespace:
+            metadata['namespace'] = namespace
+        key = self._key(namespace, metadata['name'])
+        with self.cond:
+            store = self._store(plural)
+            if key in store:
+                raise FakeApiError(409, "AlreadyExists")
+            metadata['uid'] = f"uid-{next(self._uids)}"
+            metadata['generation'] = 1
+            metadata['creationTimestamp'] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            self._stamp(obj)
+            store[key] = obj
+            self._track_owners(plural, key, obj)
+            self._emit(plural, "ADDED", obj)
+            return copy.deepcopy(obj)
+
+    def patch(self, plural, namespace, name, patch, subresource=None, create=False):
+        """Merge patch; create=True - create-or-update (server-side apply)"""
+        key = self._key(namespace, name)
+        with self.cond:
+            store = self._store(plural)
+            obj = store.get(key)
+            if obj is None:
+                if not create:
+                    raise FakeApiError(404, "NotFound")
+                return self.create(plural, namespace, patch)
+
+            updated = copy.deepcopy(obj)
+            if subresource == "status":
+                merge(updated, {"status": patch.get('status', {})})
+            else:
+                patch = dict(patch)
+                patch.pop('status', None)
+                merge(updated, patch)
+                if updated.get('spec') != obj.get('spec'):
+                    updated['metadata']['generation'] = obj['metadata'].get('generation', 1) + 1
+            self._stamp(updated)
+            store[key] = updated
+            self._track_owners(plural, key, updated)
+            self._emit(plural, "MODIFIED", updated)
+            return copy.deepcopy(updated)
+
+    def replace(self, plural, namespace, name, obj):
+        key = self._key(namespace, name)
+        with self.cond:
+            store = self._store(plural)
+            current = store.get(key)
+            if current is None:
+                raise FakeApiError(404, "NotFound")
+            expected = obj.get('metadata', {}).get('resourceVersion')
+            if expected and expected != current['metadata']['resourceVersion']:
+                raise FakeApiError(409, "Conflict")
+            obj = copy.deepcopy(obj)
+            for field in ('uid', 'generation', 'creationTimestamp'):
+                obj['metadata'][field] = current['metadata'].get(field)
+            self._stamp(obj)
+            store[key] = obj
+            self._track_owners(plural, key, obj)
+            self._emit(plural, "MODIFIED", obj)
+            return copy.deepcopy(obj)
+
+    def delete(self, plural, namespace, name):
+        key = self._key(namespace, name)
+        with self.cond:
+            obj = self._store(plural).pop(key, None)
+            if obj is None:
+                raise FakeApiError(404, "NotFound")
+            self._stamp(obj)
+            self._emit(plural, "DELETED", obj)
+            self._collect_garbage(obj['metadata']['uid'])
+            return obj
+
+    def _track_owners(self, plural, key, obj):
+        for ref in obj['metadata'].get('ownerReferences') or []:
+            self._dependents.setdefault(ref.get('uid'), set()).add((plural, key))
+
+    def _collect_garbage(self, owner_uid):
+        """Каскадное удаление по ownerReferences (сборщик мусора)"""
+        for plural, key in self._dependents.pop(owner_uid, ()):
+            obj = self._store(plural).get(key)
+            if obj is None:
+                continue
+            owners = obj['metadata'].get('ownerReferences') or []
+            if any(ref.get('uid') == owner_uid for ref in owners):
+                self.delete(plural, obj['metadata'].get('namespace'), obj['metadata']['name'])
+
+    def compact(self):
+        """Забыть историю: следующий watch с resourceVersion получит 410"""
+        with self.cond:
+            self.events.clear()
+            self.rv += 1
+            self.compacted_rv = self.rv
+
+    def disconnect_watches(self):
+        """Оборвать все открытые watch"""
+        with self.cond:
+            self.watch_epoch += 1
+            self.cond.notify_all()
+
+    def events_after(self, rv, plural, namespace, selector):
+        matched = []
+        for event_rv, event_plural, event_type, obj in reversed(self.events):
+            if event_rv <= rv:
+                break
+            if event_plural != plural:
+                continue
+            if namespace is not None and obj['metadata'].get('namespace') != namespace:
+                continue
+            if not match_labels(obj, selector):
+                continue
+            matched.append((event_rv, event_type, obj))
+        matched.reverse()
+        return matched
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    @property
+    def faults(self):
+        return self.server.faults
+
+    def _send_json(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, code, reason):
+        self._send_json(code, {
+            "kind": "Status",
+            "apiVersion": "v1",
+            "status": "Failure",
+            "reason": reason,
+            "message": reason,
+            "code": code
+        })
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _route(self):
+        url = urlparse(self.path)
+        match = PATH_RE.match(url.path)
+        if match is None:
+            raise FakeApiError(404, "NotFound")
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        return match.groupdict(), query
+
+    def _inject(self, verb, subresource=None):
+        if self.faults.latency:
+            time.sleep(self.faults.latency)
+        if verb in ("create", "apply", "patch", "update", "delete"):
+            if random.random() < self.faults.conflict_rate:
+                raise FakeApiError(409, "Conflict")
+            # 404 на status существующего CR оператор понимает как удаление CR
+            # и status не повторяет: прогон с not_found_rate не сошелся бы
+            if subresource != "status" and random.random() < self.faults.not_found_rate:
+                raise FakeApiError(404, "NotFound")
+
+    def _handle(self, method):
+        # Тело читается до любых ошибок, иначе оно испортит следующий
+        # запрос в том же keep-alive соединении
+        body = self._body() if method in ("POST", "PUT", "PATCH", "DELETE") else None
+        try:
+            route, query = self._route()
+            plural, namespace, name = route['plural'], route['namespace'], route['name']
+
+            if method == "GET" and name is None and query.get('watch') in ("true", "1", "True"):
+                self._watch(plural, namespace, query)
+                return
+
+            verb = {
+                "GET": "get" if name else "list",
+                "POST": "create",
+                "PUT": "update",
+                "DELETE": "delete",
+            }.get(method)
+            if method == "PATCH":
+                content_type = self.headers.get('Content-Type', '')
+                verb = "apply" if "apply-patch" in content_type else "patch"
+            self.state.calls[(verb, plural)] += 1
+            self._inject(verb, route['subresource'])
+
+            if verb == "list":
+                self._list(plural, namespace, query)
+            elif verb == "get":
+                self._send_json(200, self.state.get(plural, namespace, name))
+            elif verb == "create":
+                self._send_json(201, self.state.create(plural, namespace, body))
+            elif verb in ("apply", "patch"):
+                obj = self.state.patch(
+                    plural, namespace, name, body,
+                    subresource=route['subresource'],
+                    create=(verb == "apply")
+                )
+                self._send_json(200, obj)
+            elif verb == "update":
+                self._send_json(200, self.state.replace(plural, namespace, name, body))
+            elif verb == "delete":
+                self._send_json(200, self.state.delete(plural, namespace, name))
+        except FakeApiError as e:
+            self._send_error(e.code, e.reason)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _list(self, plural, namespace, query):
+        items, rv = self.state.list(plural, namespace, query.get('labelSelector'))
+        offset = int(query.get('continue') or 0)
+        limit = int(query.get('limit') or 0)
+        metadata = {"resourceVersion": rv}
+        if limit:
+            page = items[offset:offset + limit]
+            if offset + limit < len(items):
+                metadata['continue'] = str(offset + limit)
+            items = page
+        self._send_json(200, {"kind": "List", "apiVersion": "v1", "metadata": metadata, "items": items})
+
+    def _write_chunk(self, event):
+        data = json.dumps(event).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _watch(self, plural, namespace, query):
+        selector = query.get('labelSelector')
+        timeout = float(query.get('timeoutSeconds') or 1800)
+        bookmarks = query.get('allowWatchBookmarks') in ("true", "True", "1")
+        rv = query.get('resourceVersion')
+
+        if self.faults.latency:
+            time.sleep(self.faults.latency)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        with self.state.cond:
+            self.state.active_watches += 1
+            epoch = self.state.watch_epoch
+            if rv in (None, "", "0"):
+                # Без resourceVersion: ADDED для всех текущих объектов
+                items, current = self.state.list(plural, namespace, selector)
+                initial = [{"type": "ADDED", "object": obj} for obj in items]
+                position = int(current)
+            elif int(rv) < self.state.compacted_rv or random.random() < self.faults.gone_rate:
+                initial = [{"type": "ERROR", "object": {
+                    "kind": "Status", "apiVersion": "v1", "status": "Failure",
+                    "reason": "Expired", "message": "too old resource version", "code": 410
+                }}]
+                position = None
+            else:
+                initial = []
+                position = int(rv)
+            # Отказы 410 учитываются отдельно от успешно открытых watch
+            self.state.calls[("watch" if position is not None else "watch_gone", plural)] += 1
+
+        try:
+            for event in initial:
+                self._write_chunk(event)
+            deadline = time.monotonic() + timeout
+            last_bookmark = time.monotonic()
+
+            while position is not None:
+                with self.state.cond:
+                    remaining = deadline - time.monotonic()
+                    events = self.state.events_after(position, plural, namespace, selector)
+                    if not events and remaining > 0 and self.state.watch_epoch == epoch:
+                        self.state.cond.wait(min(remaining, 1.0))
+                        events = self.state.events_after(position, plural, namespace, selector)
+                    disconnected = self.state.watch_epoch != epoch
+                    current_rv = self.state.rv
+
+                for event_rv, event_type, obj in events:
+                    self._write_chunk({"type": event_type, "object": obj})
+                    position = event_rv
+                if disconnected:
+                    # Обрыв без завершающего чанка, как при падении соединения
+                    self.close_connection = True
+                    return
+                if time.monotonic() >= deadline:
+                    break
+                if bookmarks and time.monotonic() - last_bookmark > 1.0:
+                    self._write_chunk({"type": "BOOKMARK", "object": {
+                        "kind": "Bookmark", "metadata": {"resourceVersion": str(current_rv)}
+                    }})
+                    position = max(position, current_rv)
+                    last_bookmark = time.monotonic()
+
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            with self.state.cond:
+                self.state.active_watches -= 1
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """In-process API сервер Kubernetes для бенчмарков"""
+
+    daemon_threads = True
+
+    def __init__(self, faults=None, history=100000, port=0):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.state = FakeState(history=history)
+        self.faults = faults or Faults()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="fake-apiserver", daemon=True)
+        thread.start()
+        return thread
+
+    def kubeconfig(self):
+        """kubeconfig (JSON - подмножество YAML) для load_kube_config()"""
+        return {
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [{"name": "fake", "cluster": {"server": self.url}}],
+            "users": [{"name": "fake", "user": {"token": "fake"}}],
+            "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "fake"}}],
+            "current-context": "fake"
+        }
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""Бенчмарк оператора против in-process fake API сервера.
+
+Примеры:
+    python bench/run.py --workload all
+    python bench/run.py --workload create --instances 1000 --latency 0.002
+    python bench/run.py --workload update --runtime async --conflict-rate 0.05
+    python bench/run.py --workload all --json results.json
+
+Каждая нагрузка из --workload all запускается в отдельном процессе,
+чтобы peak RSS не накапливался между ними.
+"""
+
+from statistics import quantiles
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_apiserver import FakeApiServer, Faults  # noqa: E402
+
+WORKLOADS = ("create", "update", "delete", "restart", "resync")
+CHILD_PLURALS = ("secrets", "configmaps", "persistentvolumeclaims", "deployments", "services")
+WRITE_VERBS = ("create", "apply", "patch", "update", "delete")
+
+logger = logging.getLogger("bench")
+
+
+class Recorder:
+    """Длительности reconcile и время последней активности оператора"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.latencies = []
+            self.last_activity = time.monotonic()
+
+    def record(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.last_activity = time.monotonic()
+
+
+class MainRuntime:
+    """main.MySQLOperator: informer + workqueue"""
+
+    def __init__(self, args, recorder):
+        import main
+        self.operator = main.MySQLOperator(
+            workers=args.workers,
+            qps=args.qps,
+            burst=args.burst,
+            metrics_port=0,
+            resync_period=args.resync_period,
+            bulk_in_flight=args.bulk_in_flight
+        )
+        handler = self.operator.worker_pool.handler
+
+        def timed(key):
+            start = time.perf_counter()
+            try:
+                handler(key)
+            finally:
+                recorder.record(time.perf_counter() - start)
+
+        self.operator.worker_pool.handler = timed
+
+    def start(self):
+        threading.Thread(target=self.operator.run, name="operator", daemon=True).start()
+
+    def stop(self):
+        self.operator.mysqls.stop()
+        for informer in self.operator.informers.values():
+            informer.stop()
+        self.operator.worker_pool.stop()
+
+
+class AsyncRuntime:
+    """async_operator.AsyncMySQLOperator в отдельном event loop"""
+
+    def __init__(self, args, recorder):
+        import async_operator
+        self.operator = async_operator.AsyncMySQLOperator(
+            concurrency=args.workers,
+            pool_size=args.pool_size,
+            metrics_port=0
+        )
+        handler = self.operator.handle_mysql_cr
+
+        async def timed(event):
+            start = time.perf_counter()
+            try:
+                await handler(event)
+            finally:
+                recorder.record(time.perf_counter() - start)
+
+        self.operator.handle_mysql_cr = timed
+        self.loop = asyncio.new_event_loop()
+        self.task = None
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(self.operator.run())
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+
+    def start(self):
+        threading.Thread(target=self._run, name="operator", daemon=True).start()
+
+    def stop(self):
+        if self.task is not None:
+            self.loop.call_soon_threadsafe(self.task.cancel)
+
+
+RUNTIMES = {"main": MainRuntime, "async": AsyncRuntime}
+
+
+def mysql_cr(name, namespace, image="mysql:8.0"):
+    return {
+        "apiVersion": "otus.homework/v1",
+        "kind": "MySQL",
+        "metadata": {"name": name, "namespace": namespace},
+        "spec": {
+            "image": image,
+            "database": "bench",
+            "rootPassword": "root",
+            "username": "user",
+            "password": "password",
+            "storageSize": "1Gi"
+        }
+    }
+
+
+def deployment_images(state):
+    with state.cond:
+        return [
+            obj['spec']['template']['spec']['containers'][0]['image']
+            for obj in state.objects.get('deployments', {}).values()
+        ]
+
+
+def children_count(state):
+    with state.cond:
+        return sum(len(state.objects.get(plural, {})) for plural in CHILD_PLURALS)
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.server = FakeApiServer(Faults(
+            latency=args.latency,
+            conflict_rate=args.conflict_rate,
+            not_found_rate=args.not_found_rate,
+            gone_rate=args.gone_rate
+        ))
+        self.state = self.server.state
+        self.recorder = Recorder()
+        # Затишье, после которого нагрузка считается завершенной
+        self.quiet = args.quiet
+        self.keys = [
+            (f"bench-{i % args.namespaces}", f"db-{i}")
+            for i in range(args.instances)
+        ]
+
+    def __enter__(self):
+        self.server.start()
+        # Оператор загружает конфигурацию как при локальной разработке
+        fd, self.kubeconfig = tempfile.mkstemp(suffix=".kubeconfig")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.server.kubeconfig(), f)
+        os.environ["KUBECONFIG"] = self.kubeconfig
+        os.environ.pop("KUBERNETES_SERVICE_HOST", None)
+
+        self.runtime = RUNTIMES[self.args.runtime](self.args, self.recorder)
+        # Логирование настраивается при импорте модулей оператора
+        logging.getLogger().setLevel(logging.INFO if self.args.verbose else logging.WARNING)
+        self.runtime.start()
+        return self
+
+    def __exit__(self, *exc):
+        # Ошибки оборванных при остановке watch не относятся к результату
+        logging.getLogger().setLevel(logging.CRITICAL)
+        self.runtime.stop()
+        self.state.disconnect_watches()
+        self.server.shutdown()
+        os.unlink(self.kubeconfig)
+        return False
+
+    def wait_until(self, condition, quiet=None):
+        """Ожидание condition() и затишья оператора.
+
+        Возвращает момент завершения: последний reconcile или момент, когда
+        condition() стало истинным, если это произошло позже.
+        """
+        quiet = self.args.quiet if quiet is None else quiet
+        deadline = time.monotonic() + self.args.timeout
+        met_at = None
+        while time.monotonic() < deadline:
+            if not condition():
+                met_at = None
+            else:
+                met_at = met_at or time.monotonic()
+                if time.monotonic() - self.recorder.last_activity >= quiet:
+                    return max(met_at, self.recorder.last_activity)
+            time.sleep(0.02)
+        raise TimeoutError(f"workload did not converge in {self.args.timeout}s")
+
+    def create_all(self, image="mysql:8.0"):
+        for namespace, name in self.keys:
+            self.state.create("mysqls", namespace, mysql_cr(name, namespace, image))
+
+    def converged(self, image="mysql:8.0"):
+        images = deployment_images(self.state)
+        return len(images) == len(self.keys) and all(i == image for i in images)
+
+    def setup(self):
+        """Общая подготовка: все CR созданы и обработаны"""
+        self.create_all()
+        self.wait_until(lambda: self.converged() and self.statuses_written())
+
+    def workload_create(self):
+        self.create_all()
+        return len(self.keys), lambda: self.converged() and self.statuses_written()
+
+    def workload_update(self):
+        self.setup()
+        self.begin()
+        image = "mysql:8.0"
+        for round_ in range(self.args.rounds):
+            image = f"mysql:8.0.{round_ + 1}"
+            for namespace, name in self.keys:
+                self.state.patch("mysqls", namespace, name, {"spec": {"image": image}})
+        return len(self.keys) * self.args.rounds, lambda: self.converged(image)
+
+    def workload_delete(self):
+        self.setup()
+        self.begin()
+        for namespace, name in self.keys:
+            self.state.delete("mysqls", namespace, name)
+        return len(self.keys), lambda: children_count(self.state) == 0
+
+    def watches_reopened(self, active, opened):
+        """Открыты ли заново все active watch после момента с opened watch"""
+        with self.state.cond:
+            current = sum(n for (verb, _), n in self.state.calls.items() if verb == "watch")
+            return self.state.active_watches >= active and current >= opened + active
+
+    def workload_restart(self):
+        self.setup()
+        self.begin()
+        with self.state.cond:
+            active = self.state.active_watches
+
+        def disconnect():
+            with self.state.cond:
+                opened = sum(n for (verb, _), n in self.state.calls.items() if verb == "watch")
+            self.state.disconnect_watches()
+            return lambda: self.watches_reopened(active, opened) and self.converged()
+
+        for _ in range(self.args.restarts):
+            self.wait_until(disconnect())
+
+        # Время нагрузки - восстановление всех watch после 410 (relist)
+        self.started = time.monotonic()
+        self.state.compact()
+        return 0, disconnect()
+
+    def workload_resync(self):
+        if self.args.runtime != "main":
+            raise SystemExit("resync workload needs --runtime main")
+        # Resync не дает оператору затихнуть: ждем записи status всех CR
+        self.create_all()
+        self.wait_until(lambda: self.converged() and self.statuses_written(), quiet=0)
+        self.begin()
+        # Один полный период: каждый CR должен пройти reconcile хотя бы раз
+        self.quiet = 0
+        return len(self.keys), lambda: len(self.recorder.latencies) >= len(self.keys)
+
+    def statuses_written(self):
+        with self.state.cond:
+            return all(
+                (obj.get('status') or {}).get('observedGeneration') is not None
+                for obj in self.state.objects.get('mysqls', {}).values()
+            )
+
+    def begin(self):
+        self.recorder.reset()
+        self.calls_before = self.state.calls.copy()
+        self.started = time.monotonic()
+
+    def run(self, workload):
+        self.begin()
+        events, condition = getattr(self, f"workload_{workload}")()
+        converged = True
+        try:
+            finished = self.wait_until(condition, self.quiet)
+        except TimeoutError as e:
+            # Например, ошибка apply без повторной попытки
+            logger.error(f"{workload}: {e}")
+            converged = False
+            finished = time.monotonic()
+        elapsed = max(finished - self.started, 1e-9)
+
+        calls = self.state.calls - self.calls_before
+        api_calls = sum(n for (verb, plural), n in calls.items() if verb != "watch" and plural != "leases")
+        writes = sum(n for (verb, plural), n in calls.items() if verb in WRITE_VERBS and plural != "leases")
+        lists = sum(n for (verb, _), n in calls.items() if verb == "list")
+
+        latencies = sorted(self.recorder.latencies)
+        reconciles = len(latencies)
+        if reconciles >= 2:
+            percentiles = quantiles(latencies, n=100, method="inclusive")
+            p50, p99 = percentiles[49], percentiles[98]
+        else:
+            p50 = p99 = latencies[0] if latencies else 0.0
+
+        return {
+            "workload": workload,
+            "runtime": self.args.runtime,
+            "instances": len(self.keys),
+            "converged": converged,
+            "events": events,
+            "seconds": round(elapsed, 3),
+            "events_per_sec": round(events / elapsed, 1),
+            "reconciles": reconciles,
+            "p50_ms": round(p50 * 1000, 2),
+            "p99_ms": round(p99 * 1000, 2),
+            "api_calls": api_calls,
+            "writes": writes,
+            "lists": lists,
+            "api_calls_per_reconcile": round(api_calls / reconciles, 2) if reconciles else None,
+            # ru_maxrss в KiB (Linux); включает и fake API сервер
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        }
+
+
+def print_table(results):
+    columns = [
+        "workload", "runtime", "converged", "events", "seconds", "events_per_sec", "reconciles",
+        "p50_ms", "p99_ms", "api_calls_per_reconcile", "writes", "lists", "peak_rss_mb"
+    ]
+    rows = [[str(result.get(column)) for column in columns] for result in results]
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", choices=WORKLOADS + ("all",), default="all")
+    parser.add_argument("--runtime", choices=tuple(RUNTIMES), default="main")
+    parser.add_argument("--instances", type=int, default=1000, help="количество MySQL CR")
+    parser.add_argument("--namespaces", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=5, help="изменений spec на CR в update")
+    parser.add_argument("--restarts", type=int, default=5, help="обрывов watch в restart")
+    parser.add_argument("--resync-period", type=float, default=0,
+                        help="период resync (runtime main), с; 0 - выключен, для resync - 10")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=32)
+    parser.add_argument("--bulk-in-flight", type=int, default=32, help="bulk provisioning (runtime main); 0 - выключен")
+    parser.add_argument("--qps", type=float, default=10)
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка каждого запроса, с")
+    parser.add_argument("--conflict-rate", type=float, default=0.0, help="доля записей с ответом 409")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="доля записей с ответом 404")
+    parser.add_argument("--gone-rate", type=float, default=0.0, help="доля resume watch с ответом 410")
+    parser.add_argument("--quiet", type=float, default=1.0, help="затишье, после которого нагрузка завершена, с")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--json", help="записать результаты в файл")
+    parser.add_argument("--verbose", action="store_true", help="логи оператора")
+    args = parser.parse_args(argv)
+    if args.workload == "resync" and not args.resync_period:
+        args.resync_period = 10
+    return args
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+
+    if args.workload == "all":
+        results = []
+        for workload in WORKLOADS:
+            # resync - только у threaded runtime (periodic resync informer'ов)
+            if workload == "resync" and args.runtime != "main":
+                continue
+            child = argv + ["--workload", workload, "--json", "-"]
+            # Код возврата дочернего процесса - только об ошибках: сходимость в results
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__)] + child,
+                check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            results.extend(json.loads(output.splitlines()[-1]))
+    else:
+        with Bench(args) as bench:
+            results = [bench.run(args.workload)]
+
+    if args.json == "-":
+        print(json.dumps(results))
+        return 0
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    # Несошедшийся прогон - ошибка (для CI)
+    return 0 if all(result["converged"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Порядок создания внутри CR: Deployment и StatefulSet ссылаются на Secret,
+# ConfigMap и PVC, поэтому создаются только после них. hostPath PV (HOSTPATH_PV)
+# создается вместе с PVC: PVC с volumeName ждет появления PV сам
+STAGES = (
+    ("Secret", "ConfigMap", "PersistentVolume", "PersistentVolumeClaim", "Service"),
+    ("Deployment", "StatefulSet"),
+)
+
+
+class BulkProvisioner:
+    """Параллельное создание дочерних объектов пачки CR.
+
+    Объекты группируются по kind и создаются этапами из STAGES: сначала
+    независимые (Secret, ConfigMap, PV, PVC, Service) всех CR, затем Deployment и
+    StatefulSet тех CR, у которых первый этап прошел без ошибок. Одновременно
+    выполняется не более in_flight запросов. prepare(key, manifests), если задан,
+    вызывается для каждого CR до первого этапа; CR, для которых он упал,
+    пропускаются целиком.
+    """
+
+    def __init__(self, apply, in_flight=32, progress_interval=5, prepare=None):
+        self.apply = apply
+        self.prepare = prepare
+        self.in_flight = in_flight
+        self.progress_interval = progress_interval
+
+    def provision(self, batch):
+        """batch: {ключ CR: [манифесты]}; возвращает ключи CR с ошибками"""
+        failed = set()
+        total = sum(len(manifests) for manifests in batch.values())
+        done = 0
+        started = last_report = time.monotonic()
+        logger.info(f"Bulk provisioning {len(batch)} MySQL CRs ({total} objects)")
+
+        with ThreadPoolExecutor(max_workers=self.in_flight, thread_name_prefix="bulk") as executor:
+            if self.prepare is not None:
+                futures = {executor.submit(self.prepare, key, manifests): key for key, manifests in batch.items()}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Bulk provisioning of {key} failed: {e}")
+                        failed.add(key)
+
+            for number, kinds in enumerate(STAGES, 1):
+                futures = {}
+                for kind in kinds:
+                    for key, manifests in batch.items():
+                        if key in failed:
+                            continue
+                        for manifest in manifests:
+                            if manifest['kind'] == kind:
+                                futures[executor.submit(self.apply, manifest)] = key
+
+                metrics.BULK_PENDING.inc(len(futures))
+                for future in as_completed(futures):
+                    key = futures[future]
+                    metrics.BULK_PENDING.dec()
+                    done += 1
+                    try:
+                        future.result()
+                    except Exception as e:
+                        if key not in failed:
+                            logger.error(f"Bulk provisioning of {key} failed: {e}")
+                        failed.add(key)
+
+                    if time.monotonic() - last_report >= self.progress_interval:
+                        last_report = time.monotonic()
+                        logger.info(
+                            f"Bulk provisioning: stage {number}/{len(STAGES)}, "
+                            f"{done}/{total} objects, {len(failed)} CRs failed"
+                        )
+
+        logger.info(
+            f"Bulk provisioning of {len(batch) - len(failed)}/{len(batch)} MySQL CRs "
+            f"finished in {time.monotonic() - started:.1f}s"
+        )
+        return failed
+
+
+class BatchWindow:
+    """Сбор ключей в пачку для flush(keys).
+
+    Пачка отдается, когда window секунд не приходило новых ключей или в ней
+    набралось max_size ключей. flush выполняется в потоке окна, поэтому
+    следующая пачка копится, пока обрабатывается текущая.
+    """
+
+    def __init__(self, flush, window=0.2, max_size=1000):
+        self.flush = flush
+        self.window = window
+        self.max_size = max_size
+
+        self._cond = threading.Condition()
+        self._keys = {}
+        self._last_add = 0.0
+        self._stop = False
+
+    def add(self, key):
+        with self._cond:
+            self._keys[key] = None
+            self._last_add = time.monotonic()
+            self._cond.notify()
+
+    def _take(self):
+        with self._cond:
+            while not self._keys and not self._stop:
+                self._cond.wait()
+            while not self._stop and len(self._keys) < self.max_size:
+                remaining = self._last_add + self.window - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            keys, self._keys = list(self._keys), {}
+            return keys
+
+    def run(self):
+        while not self._stop:
+            keys = self._take()
+            if not keys:
+                continue
+            try:
+                self.flush(keys)
+            except Exception as e:
+                logger.error(f"Error processing batch of {len(keys)} keys: {e}")
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="batch-window", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы окна профилирования и числа строк в ответе
+MAX_SECONDS = 60
+MAX_TOP = 500
+
+# Верхний кадр потока, ожидающего блокировку, сокет или таймер: такие потоки
+# не занимают CPU и без фильтра заполняют профиль ожиданием
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("socket.py", "readinto"),
+    ("socket.py", "accept"),
+    ("ssl.py", "read"),
+    ("ssl.py", "recv_into"),
+    ("queue.py", "get"),
+    ("socketserver.py", "serve_forever"),
+}
+
+
+def _frame_name(frame):
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+
+
+def _is_idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+def sample_stacks(seconds, interval=0.01, include_idle=False):
+    """Сэмплирующий профиль всех потоков, кроме текущего.
+
+    Раз в interval снимает стеки через sys._current_frames() и считает
+    одинаковые стеки. Возвращает (число проходов, Counter стеков в формате
+    collapsed: "поток;файл:функция;..." - вход для flamegraph.pl/speedscope).
+    """
+    me = threading.get_ident()
+    stacks = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (not include_idle and _is_idle(frame)):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+    return samples, stacks
+
+
+def allocation_diff(seconds, top=30, group_by="lineno"):
+    """Рост памяти за окно seconds по данным tracemalloc: строки top мест.
+
+    Если tracemalloc не был включен, он включается только на время окна
+    (трассировка замедляет аллокации) и отслеживает лишь новые выделения.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), group_by)
+    lines = [f"# traced: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB"]
+    lines.extend(str(stat) for stat in stats[:top])
+    return lines
+
+
+def thread_stacks():
+    """Текущие стеки всех потоков"""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f"Thread {names.get(ident, ident)} ({ident}):")
+        lines.extend(line.rstrip("\n") for line in traceback.format_stack(frame))
+        lines.append("")
+    return lines
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "mysql-operator-debug"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        route = {
+            "/debug/state": self._state,
+            "/debug/threads": self._threads,
+            "/debug/profile": self._profile,
+            "/debug/tracemalloc": self._tracemalloc,
+        }.get(url.path)
+        if route is None:
+            self._send(404, "text/plain", "\n".join(["Not found, endpoints:", *self.server.ROUTES]))
+            return
+        try:
+            route(params)
+        except ValueError as e:
+            self._send(400, "text/plain", str(e))
+        except Exception as e:
+            logger.exception(f"Debug endpoint {url.path} failed")
+            self._send(500, "text/plain", f"{type(e).__name__}: {e}")
+
+    def _state(self, params):
+        state = {name: source() for name, source in self.server.sources.items()}
+        self._send(200, "application/json", json.dumps(state, ensure_ascii=False, indent=2, default=str))
+
+    def _threads(self, params):
+        self._send(200, "text/plain", "\n".join(thread_stacks()))
+
+    def _profile(self, params):
+        seconds = _bounded(params, "seconds", 10, 0.1, MAX_SECONDS)
+        interval = _bounded(params, "interval", 0.01, 0.001, 1)
+        include_idle = params.get("idle", "false").lower() in ("1", "true", "yes")
+        with self._exclusive("profile") as acquired:
+            if acquired:
+                samples, stacks = sample_stacks(seconds, interval, include_idle)
+                body = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+                self._send(200, "text/plain", body, {"X-Samples": str(samples)})
+
+    def _tracemalloc(self, params):
+        seconds = _bounded(params, "seconds", 10, 0, MAX_SECONDS)
+        top = int(_bounded(params, "top", 30, 1, MAX_TOP))
+        group_by = params.get("group_by", "lineno")
+        if group_by not in ("lineno", "filename", "traceback"):
+            raise ValueError("group_by must be lineno, filename or traceback")
+        with self._exclusive("tracemalloc") as acquired:
+            if acquired:
+                self._send(200, "text/plain", "\n".join(allocation_diff(seconds, top, group_by)))
+
+    @contextmanager
+    def _exclusive(self, name):
+        """Одно профилирование за раз: параллельный запрос получает 409"""
+        if not self.server.busy.acquire(blocking=False):
+            self._send(409, "text/plain", "Another profile is running")
+            yield False
+            return
+        logger.info(f"Debug {name} started")
+        try:
+            yield True
+        finally:
+            self.server.busy.release()
+
+    def _send(self, code, content_type, body, headers=None):
+        data = (body + "\n").encode()
+        self.send_response(code)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Debug request: {format % args}")
+
+
+def _bounded(params, name, default, low, high):
+    try:
+        value = float(params.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    return min(max(value, low), high)
+
+
+class DebugServer(ThreadingHTTPServer):
+    """Отладочный HTTP endpoint (включается явно, DEBUG_PORT).
+
+    /debug/state      - JSON из sources: {имя: функция без аргументов}
+    /debug/threads    - стеки всех потоков
+    /debug/profile    - сэмплирующий CPU профиль (seconds, interval, idle)
+    /debug/tracemalloc - рост памяти за окно (seconds, top, group_by)
+
+    По умолчанию слушает только 127.0.0.1: доступ через kubectl port-forward.
+    """
+
+    ROUTES = ("/debug/state", "/debug/threads", "/debug/profile", "/debug/tracemalloc")
+    daemon_threads = True
+
+    def __init__(self, port, sources, address="127.0.0.1"):
+        super().__init__((address, port), _Handler)
+        self.sources = sources
+        self.busy = threading.Lock()
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="debug-server", daemon=True)
+        thread.start()
+        logger.info(f"Debug endpoint on {self.server_address[0]}:{self.server_address[1]}")
+        return thread
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+import json
+import random
+import threading
+import time
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Метка, по которой строится вторичный индекс (имя MySQL CR)
+INDEX_LABEL = "instance"
+
+
+def object_key(obj):
+    """Ключ объекта в кэше: namespace/name (или name для cluster-scoped)"""
+    metadata = obj.get('metadata', {})
+    namespace = metadata.get('namespace')
+    name = metadata.get('name')
+    return f"{namespace}/{name}" if namespace else name
+
+
+def _trim(obj):
+    """Удаление полей, которые оператор не читает.
+
+    managedFields (владельцы полей server-side apply) - заметная часть
+    объема каждого объекта; в кэше тысяч объектов это лишняя память.
+    """
+    obj.get('metadata', {}).pop('managedFields', None)
+    return obj
+
+
+def split_key(key):
+    """Разбор ключа namespace/name"""
+    if '/' in key:
+        namespace, name = key.split('/', 1)
+        return namespace, name
+    return None, key
+
+
+class Informer:
+    """List + watch одного типа ресурсов с хранением объектов в памяти.
+
+    Объекты хранятся как dict (raw JSON от API сервера) по ключу namespace/name.
+    Вторичный индекс по метке instance использует тот же формат ключа, что и
+    MySQL CR (namespace/instance), поэтому дочерние объекты CR находятся
+    одним обращением к by_index().
+    """
+
+    def __init__(self, kind, list_func, index_label=INDEX_LABEL, page_size=500,
+                 watch_timeout=300, backoff_base=0.5, backoff_max=30, **list_kwargs):
+        self.kind = kind
+        self._list_func = list_func
+        self._list_kwargs = list_kwargs
+        self._index_label = index_label
+        self._page_size = page_size
+        self._watch_timeout = watch_timeout
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+
+        self._lock = threading.RLock()
+        self._store = {}
+        self._index = {}
+        self._handlers = []
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+
+        self.resource_version = None
+        # Время (monotonic) последнего list, начала текущего watch и последнего события
+        self._listed_at = None
+        self._watch_started_at = None
+        self._event_at = None
+        self._thread = None
+
+    def add_handler(self, handler):
+        """Подписка на изменения: handler(event_type, obj, old)"""
+        self._handlers.append(handler)
+
+    def get(self, namespace, name):
+        """Объект из кэша или None"""
+        key = f"{namespace}/{name}" if namespace else name
+        with self._lock:
+            return self._store.get(key)
+
+    def get_by_key(self, key):
+        with self._lock:
+            return self._store.get(key)
+
+    def by_index(self, value):
+        """Объекты с меткой instance, value - ключ namespace/instance"""
+        with self._lock:
+            return [self._store[key] for key in self._index.get(value, ())]
+
+    def keys(self):
+        with self._lock:
+            return list(self._store)
+
+    def list(self):
+        with self._lock:
+            return list(self._store.values())
+
+    def has_synced(self):
+        return self._synced.is_set()
+
+    def wait_for_sync(self, timeout=None):
+        return self._synced.wait(timeout)
+
+    def _index_value(self, obj):
+        metadata = obj.get('metadata', {})
+        value = (metadata.get('labels') or {}).get(self._index_label)
+        if value is None:
+            return None
+        namespace = metadata.get('namespace')
+        return f"{namespace}/{value}" if namespace else value
+
+    def _index_add(self, key, obj):
+        value = self._index_value(obj)
+        if value is not None:
+            self._index.setdefault(value, set()).add(key)
+
+    def _index_remove(self, key, obj):
+        value = self._index_value(obj)
+        keys = self._index.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._index[value]
+
+    def _dispatch(self, event_type, obj, old):
+        for handler in self._handlers:
+            try:
+                handler(event_type, obj, old)
+            except Exception as e:
+                logger.error(f"Error in {self.kind} handler: {e}")
+
+    def _replace(self, items):
+        """Замена содержимого кэша результатом list с генерацией разницы событиями"""
+        store = {object_key(obj): obj for obj in items}
+        events = []
+
+        with self._lock:
+            for key, obj in store.items():
+                old = self._store.get(key)
+                if old is None:
+                    events.append(("ADDED", obj, None))
+                elif old['metadata'].get('resourceVersion') != obj['metadata'].get('resourceVersion'):
+                    events.append(("MODIFIED", obj, old))
+            for key, old in self._store.items():
+                if key not in store:
+                    events.append(("DELETED", old, old))
+
+            self._store = store
+            self._index = {}
+            for key, obj in store.items():
+                self._index_add(key, obj)
+
+        for event_type, obj, old in events:
+            self._dispatch(event_type, obj, old)
+
+    def _update(self, event_type, obj):
+        """Применение события watch к кэшу"""
+        key = object_key(obj)
+
+        with self._lock:
+            old = self._store.get(key)
+            if old is not None:
+                self._index_remove(key, old)
+            if event_type == 'DELETED':
+                self._store.pop(key, None)
+            else:
+                self._store[key] = obj
+                self._index_add(key, obj)
+
+        self._dispatch(event_type, obj, old)
+
+    def _list(self):
+        """Постраничный list (limit/continue) с заменой содержимого кэша"""
+        items = []
+        token = None
+        while True:
+            kwargs = dict(self._list_kwargs, limit=self._page_size)
+            if token:
+                kwargs['_continue'] = token
+            # Сырой JSON без десериализации в модели клиента
+            with metrics.api_call("list", self.kind):
+                response = self._list_func(_preload_content=False, **kwargs)
+            data = json.loads(response.data)
+            items.extend(_trim(obj) for obj in data.get('items') or [])
+            metadata = data.get('metadata', {})
+            token = metadata.get('continue')
+            if not token:
+                break
+
+        self._replace(items)
+        self.resource_version = metadata.get('resourceVersion')
+        self._listed_at = time.monotonic()
+        self._synced.set()
+        logger.info(f"Informer {self.kind} synced: {len(items)} objects at resourceVersion {self.resource_version}")
+
+    def _watch(self):
+        """Watch с последней resourceVersion; завершается по таймауту сервера"""
+        w = watch.Watch()
+        self._watch_started_at = time.monotonic()
+        # timeout_seconds отключает внутренние повторы Watch: переподключение
+        # и обработку 410 Gone выполняет run()
+        for event in w.stream(
+            self._list_func,
+            resource_version=self.resource_version,
+            allow_watch_bookmarks=True,
+            timeout_seconds=self._watch_timeout,
+            **self._list_kwargs
+        ):
+            if self._stop.is_set():
+                w.stop()
+                break
+
+            obj = event['raw_object']
+            self._event_at = time.monotonic()
+            self.resource_version = obj.get('metadata', {}).get('resourceVersion', self.resource_version)
+            if event['type'] == 'BOOKMARK':
+                continue
+            metrics.observe_event(self.kind, event['type'])
+            self._update(event['type'], _trim(obj))
+
+    def _backoff(self, failures):
+        """Экспоненциальная задержка с полным jitter"""
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * (2 ** failures)))
+
+    def run(self):
+        """Цикл list + watch (блокирующий).
+
+        Полный list выполняется только при старте и при 410 Gone, в остальных
+        случаях watch продолжается с последней resourceVersion.
+        """
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                if self.resource_version is None:
+                    self._list()
+                self._watch()
+                metrics.WATCH_RESTARTS.labels(self.kind, "timeout").inc()
+                failures = 0
+            except ApiException as e:
+                if e.status == 410:
+                    logger.info(f"Informer {self.kind}: resourceVersion {self.resource_version} expired, relisting")
+                    metrics.WATCH_RESTARTS.labels(self.kind, "gone").inc()
+                    self.resource_version = None
+                    continue
+                metrics.WATCH_RESTARTS.labels(self.kind, "error").inc()
+                logger.error(f"API exception in {self.kind} informer: {e}")
+                self._stop.wait(self._backoff(failures))
+                failures += 1
+            except Exception as e:
+                metrics.WATCH_RESTARTS.labels(self.kind, "error").inc()
+                logger.error(f"Unexpected error in {self.kind} informer: {e}")
+                self._stop.wait(self._backoff(failures))
+                failures += 1
+
+    def start(self):
+        """Запуск run() в фоновом потоке"""
+        thread = threading.Thread(target=self.run, name=f"informer-{self.kind}", daemon=True)
+        thread.start()
+        self._thread = thread
+        return thread
+
+    def join(self):
+        """Ожидание потока, запущенного start()"""
+        self._thread.join()
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        """Состояние list/watch для отладки (список из одного элемента, как у NamespacedInformers)"""
+        now = time.monotonic()
+
+        def age(moment):
+            return None if moment is None else round(now - moment, 3)
+
+        with self._lock:
+            objects = len(self._store)
+        return [{
+            "kind": self.kind,
+            "namespace": self._list_kwargs.get('namespace'),
+            "synced": self.has_synced(),
+            "objects": objects,
+            "resource_version": self.resource_version,
+            "last_list_age_seconds": age(self._listed_at),
+            "watch_age_seconds": age(self._watch_started_at),
+            "last_event_age_seconds": age(self._event_at),
+        }]
+
+
+class NamespacedInformers:
+    """Набор Informer по одному на namespace с интерфейсом одного Informer.
+
+    Для операторов, ограниченных списком namespace: list/watch идут через
+    namespaced API, объекты других namespace в память не попадают.
+    """
+
+    def __init__(self, kind, list_func, namespaces, **kwargs):
+        self.kind = kind
+        self._informers = {
+            namespace: Informer(kind, list_func, namespace=namespace, **kwargs)
+            for namespace in namespaces
+        }
+
+    def add_handler(self, handler):
+        for informer in self._informers.values():
+            informer.add_handler(handler)
+
+    def get(self, namespace, name):
+        informer = self._informers.get(namespace)
+        return informer.get(namespace, name) if informer is not None else None
+
+    def get_by_key(self, key):
+        namespace, name = split_key(key)
+        return self.get(namespace, name)
+
+    def by_index(self, value):
+        namespace, _ = split_key(value)
+        informer = self._informers.get(namespace)
+        return informer.by_index(value) if informer is not None else []
+
+    def keys(self):
+        return [key for informer in self._informers.values() for key in informer.keys()]
+
+    def list(self):
+        return [obj for informer in self._informers.values() for obj in informer.list()]
+
+    def has_synced(self):
+        return all(informer.has_synced() for informer in self._informers.values())
+
+    def wait_for_sync(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for informer in self._informers.values():
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not informer.wait_for_sync(remaining):
+                return False
+        return True
+
+    def run(self):
+        """Все informer в фоне, ожидание в текущем потоке (блокирующий)"""
+        threads = [informer.start() for informer in self._informers.values()]
+        for thread in threads:
+            thread.join()
+
+    def start(self):
+        return [informer.start() for informer in self._informers.values()]
+
+    def join(self):
+        for informer in self._informers.values():
+            informer.join()
+
+    def stop(self):
+        for informer in self._informers.values():
+            informer.stop()
+
+    def snapshot(self):
+        return [state for informer in self._informers.values() for state in informer.snapshot()]
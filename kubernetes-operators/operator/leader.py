@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+
+from kubernetes.client import V1DeleteOptions, V1Preconditions
+from kubernetes.client.rest import ApiException
+from bisect import bisect
+from datetime import datetime, timezone
+import hashlib
+import json
+import threading
+import time
+import logging
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Метка Lease участников шардирования
+SHARD_LABEL = "otus.homework/mysql-operator-shard"
+
+
+def _now():
+    """Текущее время в формате MicroTime"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _hash(value):
+    """Стабильный между процессами хэш строки"""
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class LeaseClient:
+    """Чтение и запись Lease (coordination.k8s.io/v1) в виде dict"""
+
+    def __init__(self, coordination_api, namespace):
+        self.api = coordination_api
+        self.namespace = namespace
+
+    def get(self, name):
+        try:
+            with metrics.api_call("get", "leases"):
+                response = self.api.read_namespaced_lease(name, self.namespace, _preload_content=False)
+        except ApiException as e:
+            if e.status == 404:
+                return None
+            raise
+        return json.loads(response.data)
+
+    def list(self, label_selector):
+        with metrics.api_call("list", "leases"):
+            response = self.api.list_namespaced_lease(
+                self.namespace,
+                label_selector=label_selector,
+                _preload_content=False
+            )
+        return json.loads(response.data).get('items') or []
+
+    def create(self, lease):
+        with metrics.api_call("create", "leases"):
+            self.api.create_namespaced_lease(self.namespace, lease)
+
+    def replace(self, lease):
+        # metadata.resourceVersion в теле - оптимистичная блокировка (409 при гонке)
+        with metrics.api_call("update", "leases"):
+            self.api.replace_namespaced_lease(lease['metadata']['name'], self.namespace, lease)
+
+    def delete(self, name, resource_version=None):
+        """Удаление Lease; с resource_version - только если его никто не продлил (иначе 409).
+        Уже удаленный Lease - не ошибка"""
+        preconditions = V1Preconditions(resource_version=resource_version) if resource_version else None
+        try:
+            with metrics.api_call("delete", "leases"):
+                self.api.delete_namespaced_lease(
+                    name,
+                    self.namespace,
+                    body=V1DeleteOptions(preconditions=preconditions)
+                )
+        except ApiException as e:
+            if e.status != 404:
+                raise
+
+
+class LeaderElector:
+    """Выбор лидера через Lease, как leaderelection в client-go.
+
+    Истечение чужой аренды определяется по локальным часам: запись считается
+    устаревшей, если она не менялась дольше lease_duration с момента, когда
+    мы ее увидели. Поэтому расхождение часов между узлами не влияет на выбор.
+    """
+
+    def __init__(self, coordination_api, name, namespace, identity,
+                 lease_duration=15, renew_deadline=10, retry_period=2):
+        self.leases = LeaseClient(coordination_api, namespace)
+        self.name = name
+        self.identity = identity
+        self.lease_duration = lease_duration
+        self.renew_deadline = renew_deadline
+        self.retry_period = retry_period
+
+        self._observed = None
+        self._observed_at = 0.0
+        self._stop = threading.Event()
+        self.is_leader = False
+
+    def try_acquire_or_renew(self):
+        """Одна попытка захватить или продлить аренду"""
+        now = _now()
+        lease = self.leases.get(self.name)
+
+        if lease is None:
+            try:
+                self.leases.create({
+                    "apiVersion": "coordination.k8s.io/v1",
+                    "kind": "Lease",
+                    "metadata": {"name": self.name, "namespace": self.leases.namespace},
+                    "spec": {
+                        "holderIdentity": self.identity,
+                        "leaseDurationSeconds": self.lease_duration,
+                        "acquireTime": now,
+                        "renewTime": now,
+                        "leaseTransitions": 0
+                    }
+                })
+            except ApiException as e:
+                if e.status == 409:
+                    return False
+                raise
+            return True
+
+        spec = lease.setdefault('spec', {})
+        holder = spec.get('holderIdentity')
+        record = (holder, spec.get('renewTime'))
+        if record != self._observed:
+            self._observed = record
+            self._observed_at = time.monotonic()
+
+        expired = time.monotonic() - self._observed_at > spec.get('leaseDurationSeconds', self.lease_duration)
+        if holder and holder != self.identity and not expired:
+            return False
+
+        if holder != self.identity:
+            spec['holderIdentity'] = self.identity
+            spec['acquireTime'] = now
+            spec['leaseTransitions'] = spec.get('leaseTransitions', 0) + 1
+        spec['renewTime'] = now
+        spec['leaseDurationSeconds'] = self.lease_duration
+
+        try:
+            self.leases.replace(lease)
+        except ApiException as e:
+            if e.status == 409:
+                return False
+            raise
+        return True
+
+    def _try(self):
+        try:
+            return self.try_acquire_or_renew()
+        except Exception as e:
+            logger.error(f"Error updating lease {self.name}: {e}")
+            return False
+
+    def run(self, on_started_leading, on_stopped_leading):
+        """Ожидание лидерства, затем продление аренды (блокирующий)"""
+        logger.info(f"Waiting for leadership on lease {self.name} as {self.identity}")
+        while not self._try():
+            if self._stop.wait(self.retry_period):
+                return
+
+        self.is_leader = True
+        logger.info(f"Became leader: {self.identity}")
+        on_started_leading()
+
+        last_renew = time.monotonic()
+        while not self._stop.wait(self.retry_period):
+            if self._try():
+                last_renew = time.monotonic()
+            elif time.monotonic() - last_renew > self.renew_deadline:
+                break
+
+        self.is_leader = False
+        logger.error(f"Lost leadership on lease {self.name}")
+        on_stopped_leading()
+
+    def start(self, on_started_leading, on_stopped_leading):
+        thread = threading.Thread(
+            target=self.run,
+            args=(on_started_leading, on_stopped_leading),
+            name="leader-election",
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+class ShardRing:
+    """Шардирование CR между репликами по consistent hash.
+
+    Каждая реплика продлевает собственный Lease с меткой SHARD_LABEL;
+    живые участники кольца - Lease, обновлявшиеся за последние
+    lease_duration секунд. Истекшие Lease (реплика упала или сменила имя
+    pod) удаляются, свой Lease реплика удаляет в stop(). Реплика обрабатывает
+    ключ, если он попадает в ее сегмент кольца. При изменении состава
+    вызывается on_change().
+    shard_by: "namespace" (весь namespace у одной реплики) или "key" (CR).
+    """
+
+    def __init__(self, coordination_api, namespace, identity, shard_by="namespace",
+                 lease_duration=15, renew_period=5, vnodes=64, on_change=None):
+        self.leases = LeaseClient(coordination_api, namespace)
+        self.identity = identity
+        self.shard_by = shard_by
+        self.lease_duration = lease_duration
+        self.renew_period = renew_period
+        self.vnodes = vnodes
+        self.on_change = on_change
+
+        self._lock = threading.Lock()
+        self._ring = []
+        self._hashes = []
+        self._members = ()
+        # identity -> (renewTime, когда мы увидели это значение)
+        self._observed = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def lease_name(self):
+        return f"mysql-operator-shard-{self.identity}"
+
+    @property
+    def members(self):
+        with self._lock:
+            return self._members
+
+    def owns(self, key):
+        """Принадлежит ли ключ namespace/name этой реплике"""
+        shard_key = key.split('/', 1)[0] if self.shard_by == "namespace" else key
+        with self._lock:
+            if not self._ring:
+                return False
+            index = bisect(self._hashes, _hash(shard_key)) % len(self._ring)
+            return self._ring[index][1] == self.identity
+
+    def _renew(self):
+        now = _now()
+        lease = self.leases.get(self.lease_name)
+        if lease is None:
+            self.leases.create({
+                "apiVersion": "coordination.k8s.io/v1",
+                "kind": "Lease",
+                "metadata": {
+                    "name": self.lease_name,
+                    "namespace": self.leases.namespace,
+                    "labels": {SHARD_LABEL: "true"}
+                },
+                "spec": {
+                    "holderIdentity": self.identity,
+                    "leaseDurationSeconds": self.lease_duration,
+                    "acquireTime": now,
+                    "renewTime": now
+                }
+            })
+            return
+        lease['spec']['renewTime'] = now
+        self.leases.replace(lease)
+
+    def _live_members(self):
+        now = time.monotonic()
+        live = {self.identity}
+        seen = set()
+        for lease in self.leases.list(SHARD_LABEL):
+            spec = lease.get('spec', {})
+            identity = spec.get('holderIdentity')
+            if not identity:
+                continue
+            seen.add(identity)
+            renew_time = spec.get('renewTime')
+            observed = self._observed.get(identity)
+            if observed is None or observed[0] != renew_time:
+                observed = (renew_time, now)
+                self._observed[identity] = observed
+            if now - observed[1] <= spec.get('leaseDurationSeconds', self.lease_duration):
+                live.add(identity)
+            elif identity != self.identity:
+                self._collect(lease)
+        for identity in set(self._observed) - seen:
+            del self._observed[identity]
+        return tuple(sorted(live))
+
+    def _collect(self, lease):
+        """Удаление истекшего Lease другой реплики; продленный за это время остается (409)"""
+        metadata = lease['metadata']
+        try:
+            self.leases.delete(metadata['name'], metadata.get('resourceVersion'))
+        except ApiException as e:
+            if e.status != 409:
+                logger.error(f"Error deleting expired shard lease {metadata['name']}: {e}")
+            return
+        logger.info(f"Deleted expired shard lease {metadata['name']}")
+
+    def sync(self):
+        """Продление своего Lease и пересчет кольца"""
+        self._renew()
+        members = self._live_members()
+        if members == self.members:
+            return
+
+        ring = sorted(
+            (_hash(f"{member}#{i}"), member)
+            for member in members
+            for i in range(self.vnodes)
+        )
+        with self._lock:
+            self._ring = ring
+            self._hashes = [h for h, _ in ring]
+            self._members = members
+        logger.info(f"Shard members changed: {', '.join(members)}")
+
+        if self.on_change is not None:
+            self.on_change()
+
+    def run(self):
+        while not self._stop.wait(self.renew_period):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Error syncing shard membership: {e}")
+
+    def start(self):
+        """Первая синхронизация в текущем потоке, далее - в фоне"""
+        self.sync()
+        self._thread = threading.Thread(target=self.run, name="shard-ring", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Остановка и удаление своего Lease: его ключи сразу делят оставшиеся реплики"""
+        self._stop.set()
+        if self._thread is not None:
+            # Иначе фоновый sync может заново создать удаленный Lease
+            self._thread.join()
+        try:
+            self.leases.delete(self.lease_name)
+        except Exception as e:
+            logger.error(f"Error deleting shard lease {self.lease_name}: {e}")
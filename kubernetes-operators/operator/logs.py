@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Контекст текущего reconcile: ключ CR, событие, id и время начала.
+# contextvars - отдельный у каждого потока и у каждой задачи asyncio
+_reconcile = contextvars.ContextVar("reconcile", default=None)
+# Выполняющиеся reconcile по reconcile_id (для отладочного endpoint)
+_active = {}
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def reconcile_context(key, event=None):
+    """Поля key, event, reconcile_id и duration_ms во всех записях внутри блока"""
+    context = {
+        "key": key,
+        "event": event,
+        "reconcile_id": uuid.uuid4().hex[:12],
+        "start": time.perf_counter(),
+        "thread": threading.current_thread().name,
+    }
+    token = _reconcile.set(context)
+    _active[context["reconcile_id"]] = context
+    try:
+        yield context
+    finally:
+        logger.debug("Reconcile finished")
+        del _active[context["reconcile_id"]]
+        _reconcile.reset(token)
+
+
+def active_reconciles():
+    """Выполняющиеся сейчас reconcile, самые долгие первыми"""
+    now = time.perf_counter()
+    reconciles = [
+        {
+            "key": context["key"],
+            "event": context["event"],
+            "reconcile_id": context["reconcile_id"],
+            "thread": context["thread"],
+            "elapsed_seconds": round(now - context["start"], 3),
+        }
+        for context in list(_active.values())
+    ]
+    return sorted(reconciles, key=lambda item: -item["elapsed_seconds"])
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет в запись поля контекста reconcile (в потоке, который пишет лог)"""
+
+    def filter(self, record):
+        context = _reconcile.get()
+        if context is not None:
+            record.key = context["key"]
+            record.event = context["event"]
+            record.reconcile_id = context["reconcile_id"]
+            record.duration_ms = round((time.perf_counter() - context["start"]) * 1000, 1)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Ограничение повторяющихся записей: token bucket на (ключ CR, место вызова).
+
+    Место вызова (файл и строка) одинаково у всех повторов сообщения, даже
+    если текст f-строки меняется (номер попытки, текст 409). Отброшенные
+    записи считаются, их число попадает в поле suppressed следующей записи
+    того же места, прошедшей фильтр. Хранится не более max_keys bucket.
+    """
+
+    def __init__(self, rate=1.0, burst=10, max_keys=10000):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        bucket_key = (getattr(record, "key", None), record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self._buckets[bucket_key] = [self.burst, now, 0]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(bucket_key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись"""
+
+    FIELDS = ("key", "event", "reconcile_id", "duration_ms", "suppressed")
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """QueueHandler, сохраняющий traceback отдельно от текста сообщения.
+
+    Стандартный prepare() вклеивает traceback в message, и JSON-форматтер
+    в потоке QueueListener уже не может вынести его в отдельное поле.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def setup_logging(level=logging.INFO, fmt="text", rate=1.0, burst=10):
+    """Логирование через очередь: форматирование и запись в stderr - в фоновом потоке.
+
+    В вызывающем потоке остаются только фильтры (контекст reconcile и
+    ограничение повторов) и постановка в очередь. Как и basicConfig, ничего
+    не делает, если у корневого логгера уже есть обработчики.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    handler = _PreparedQueueHandler(queue.SimpleQueue())
+    handler.addFilter(ContextFilter())
+    if rate > 0:
+        handler.addFilter(RateLimitFilter(rate=rate, burst=burst))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    global _listener
+    _listener = QueueListener(handler.queue, output)
+    _listener.start()
+    # Записи, оставшиеся в очереди, выводятся при завершении процесса
+    atexit.register(shutdown)
+    return _listener
+
+
+def shutdown():
+    """Вывод записей, оставшихся в очереди, и остановка фонового потока.
+
+    atexit не вызывается при os._exit: перед ним shutdown нужно вызвать явно.
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def setup_from_env():
+    """setup_logging по LOG_LEVEL, LOG_FORMAT (text/json), LOG_RATE и LOG_BURST"""
+    return setup_logging(
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        fmt=os.environ.get("LOG_FORMAT", "text"),
+        rate=float(os.environ.get("LOG_RATE", "1")),
+        burst=int(os.environ.get("LOG_BURST", "10"))
+    )
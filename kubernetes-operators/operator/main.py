@@ -1,298 +1,652 @@
 #!/usr/bin/env python3
 
-import kubernetes.client
 from kubernetes.client.rest import ApiException
-from kubernetes import client, config, watch
-import yaml
-import time
+from kubernetes import client, config
+import functools
+import threading
 import logging
-import hashlib
+import os
+import signal
+import socket
+import sys
+
+import logs
+import metrics
+import settings
+import storage
+from apply import ApplyEngine, lister
+from bulk import BatchWindow, BulkProvisioner
+from informer import Informer, NamespacedInformers, object_key, split_key
+from readiness import ReadinessTracker, workload_ready
+from resync import Resyncer
+from manifests import (
+    LABEL_SELECTOR, PV_FINALIZER, SPEC_HASH_ANNOTATION, ManifestRenderer, has_drifted, hostpath_overlays, load_overlays,
+    render_pv, resource_name, same_quantity, uses_hostpath, workload_kind
+)
+from profiles import parse_quantity
+from status import PHASE_FAILED, PHASE_PROVISIONING, PHASE_READY, StatusWriter, endpoints, error_message, needs_reconcile
+from workqueue import RateLimitingQueue, TokenBucket, WorkerPool
 
 # Настройка логирования
-logging.basicConfig(level=logging.INFO)
+logs.setup_from_env()
 logger = logging.getLogger(__name__)
 
+
+class ThrottledApiClient(client.ApiClient):
+    """ApiClient с общим лимитом запросов процесса (как QPS/Burst в rest.Config client-go)"""
+
+    def __init__(self, configuration, qps, burst):
+        super().__init__(configuration)
+        self.bucket = TokenBucket(qps, burst)
+
+    def call_api(self, *args, **kwargs):
+        self.bucket.wait()
+        return super().call_api(*args, **kwargs)
+
+
 class MySQLOperator:
-    def __init__(self):
+    def __init__(self, workers=4, qps=10, burst=100, metrics_port=8000,
+                 leader_election=False, shard_by=None, identity=None, lease_namespace="default",
+                 namespaces=None, resync_period=600, overlays=None, bulk_in_flight=32, bulk_min_batch=10,
+                 ready_timeout=600, debug_port=0, debug_address="127.0.0.1", api_qps=0, api_burst=100,
+                 hostpath_pv=False):
         # Загрузка конфигурации Kubernetes
         try:
             config.load_incluster_config()  # Для работы внутри кластера
         except:
             config.load_kube_config()  # Для локальной разработки
-        
-        self.v1 = client.CoreV1Api()
-        self.apps_v1 = client.AppsV1Api()
-        self.custom_api = client.CustomObjectsApi()
-        self.core_v1 = client.CoreV1Api()
+
+        # Один ApiClient (и пул соединений) на всех воркеров, bulk provisioning и watch informer'ов
+        configuration = client.Configuration.get_default_copy()
+        configuration.connection_pool_maxsize = workers + bulk_in_flight + 8
+        client.Configuration.set_default(configuration)
+        if api_qps:
+            self.api_client = ThrottledApiClient(configuration, api_qps, api_burst)
+        else:
+            self.api_client = client.ApiClient(configuration)
+        self.custom_api = client.CustomObjectsApi(self.api_client)
+        # Все дочерние объекты пишутся через server-side apply
+        self.apply_engine = ApplyEngine(self.api_client)
         
         # Группа и версия нашего CRD
         self.group = "otus.homework"
         self.version = "v1"
         self.plural = "mysqls"
-        
-    def create_deployment(self, name, namespace, spec):
-        """Создание Deployment для MySQL"""
-        
-        # Создание секрета для паролей
-        secret_manifest = {
-            "apiVersion": "v1",
-            "kind": "Secret",
-            "metadata": {
-                "name": f"{name}-mysql-secret",
-                "namespace": namespace
-            },
-            "type": "Opaque",
-            "data": {
-                "root-password": self._encode_base64(spec.get('rootPassword', 'root')),
-                "password": self._encode_base64(spec.get('password', 'password'))
-            }
-        }
-        
-        try:
-            self.v1.create_namespaced_secret(namespace, secret_manifest)
-            logger.info(f"Secret {name}-mysql-secret created")
-        except ApiException as e:
-            if e.status != 409:  # 409 - уже существует
-                logger.error(f"Error creating secret: {e}")
-                raise
-        
-        # Манифест Deployment
-        deployment_manifest = {
-            "apiVersion": "apps/v1",
-            "kind": "Deployment",
-            "metadata": {
-                "name": f"{name}-mysql",
-                "namespace": namespace,
-                "labels": {
-                    "app": "mysql",
-                    "instance": name
-                }
-            },
-            "spec": {
-                "replicas": 1,
-                "selector": {
-                    "matchLabels": {
-                        "app": "mysql",
-                        "instance": name
-                    }
-                },
-                "template": {
-                    "metadata": {
-                        "labels": {
-                            "app": "mysql",
-                            "instance": name
-                        }
-                    },
-                    "spec": {
-                        "containers": [{
-                            "name": "mysql",
-                            "image": spec.get('image', 'mysql:8.0'),
-                            "env": [
-                                {
-                                    "name": "MYSQL_ROOT_PASSWORD",
-                                    "valueFrom": {
-                                        "secretKeyRef": {
-                                            "name": f"{name}-mysql-secret",
-                                            "key": "root-password"
-                                        }
-                                    }
-                                },
-                                {
-                                    "name": "MYSQL_DATABASE",
-                                    "value": spec.get('database', 'mydb')
-                                },
-                                {
-                                    "name": "MYSQL_USER",
-                                    "value": spec.get('username', 'user')
-                                },
-                                {
-                                    "name": "MYSQL_PASSWORD",
-                                    "valueFrom": {
-                                        "secretKeyRef": {
-                                            "name": f"{name}-mysql-secret",
-                                            "key": "password"
-                                        }
-                                    }
-                                }
-                            ],
-                            "ports": [{
-                                "containerPort": 3306,
-                                "name": "mysql"
-                            }],
-                            "volumeMounts": [{
-                                "name": "mysql-storage",
-                                "mountPath": "/var/lib/mysql"
-                            }],
-                            "resources": {
-                                "requests": {
-                                    "memory": "256Mi",
-                                    "cpu": "100m"
-                                },
-                                "limits": {
-                                    "memory": "512Mi",
-                                    "cpu": "500m"
-                                }
-                            }
-                        }],
-                        "volumes": [{
-                            "name": "mysql-storage",
-                            "persistentVolumeClaim": {
-                                "claimName": f"{name}-mysql-pvc"
-                            }
-                        }]
-                    }
-                }
-            }
-        }
-        
-        try:
-            self.apps_v1.create_namespaced_deployment(namespace, deployment_manifest)
-            logger.info(f"Deployment {name}-mysql created")
-        except ApiException as e:
-            logger.error(f"Error creating deployment: {e}")
-            raise
-    
-    def create_service(self, name, namespace):
-        """Создание Service для MySQL"""
-        
-        service_manifest = {
-            "apiVersion": "v1",
-            "kind": "Service",
-            "metadata": {
-                "name": f"{name}-mysql-service",
-                "namespace": namespace,
-                "labels": {
-                    "app": "mysql",
-                    "instance": name
-                }
-            },
-            "spec": {
-                "ports": [{
-                    "port": 3306,
-                    "targetPort": 3306,
-                    "protocol": "TCP"
-                }],
-                "selector": {
-                    "app": "mysql",
-                    "instance": name
-                },
-                "type": "ClusterIP"
-            }
+        # None - весь кластер, иначе только перечисленные namespace
+        self.namespaces = namespaces
+
+        # Локальный кэш MySQL CR и дочерних объектов (informer)
+        self.mysqls = self._informer("MySQL", f"{self.group}/{self.version}", self.plural)
+        self.informers = {
+            "Secret": self._informer("Secret", "v1", "secrets", label_selector=LABEL_SELECTOR),
+            "ConfigMap": self._informer("ConfigMap", "v1", "configmaps", label_selector=LABEL_SELECTOR),
+            "PersistentVolumeClaim": self._informer(
+                "PersistentVolumeClaim", "v1", "persistentvolumeclaims", label_selector=LABEL_SELECTOR
+            ),
+            "Deployment": self._informer("Deployment", "apps/v1", "deployments", label_selector=LABEL_SELECTOR),
+            "StatefulSet": self._informer("StatefulSet", "apps/v1", "statefulsets", label_selector=LABEL_SELECTOR),
+            "Service": self._informer("Service", "v1", "services", label_selector=LABEL_SELECTOR),
         }
-        
+        # hostPath PV для CR без storageClassName (minikube, kind); PV cluster-scoped
+        self.hostpath_pv = hostpath_pv
+        if hostpath_pv:
+            self.informers["PersistentVolume"] = Informer(
+                "PersistentVolume",
+                lister(self.apply_engine.client, "v1", "persistentvolumes"),
+                label_selector=LABEL_SELECTOR
+            )
+        # События MySQL CR обрабатываются после синхронизации кэшей дочерних объектов
+        self._children_synced = threading.Event()
+
+        # Очередь reconcile по ключу namespace/name и пул воркеров
+        self.queue = RateLimitingQueue(qps=qps, burst=burst)
+        # Последнее событие, поставившее ключ в очередь (для логов)
+        self._triggers = {}
+        # CR, у которых удален дочерний объект. При удалении CR сборщик мусора
+        # удаляет дочерние объекты, а DELETED самого CR может прийти по своему
+        # watch позже: перед apply такие CR проверяются в API в обход кэша
+        self._confirm_live = set()
+        # Отказы API сервера в расширении PVC: ключ CR -> {имя PVC: (объем, сообщение)}
+        self._expansion_rejected = {}
+        self.worker_pool = WorkerPool(self.queue, self.reconcile, workers=workers)
+        self.metrics_port = metrics_port
+        # Отладочный endpoint (очередь, reconcile, watch, профили); 0 - выключен
+        self.debug_port = debug_port
+        self.debug_address = debug_address
+
+        # Периодический resync известных CR; 0 - только по событиям
+        self.resyncer = None
+        if resync_period:
+            self.resyncer = Resyncer(
+                self.queue,
+                lambda: [key for key in self.mysqls.keys() if self._owns(key)],
+                period=resync_period
+            )
+
+        # HA: один активный лидер или шардирование CR между всеми репликами
+        self.identity = identity or socket.gethostname()
+        self.shard = None
+        self.elector = None
+        if shard_by or leader_election:
+            # Только для HA: CoordinationV1Api импортирует свои модели при первом обращении
+            from leader import LeaderElector, ShardRing
+            coordination_v1 = client.CoordinationV1Api(self.api_client)
+        if shard_by:
+            self.shard = ShardRing(
+                coordination_v1,
+                lease_namespace,
+                self.identity,
+                shard_by=shard_by,
+                on_change=self._requeue_owned
+            )
+        elif leader_election:
+            self.elector = LeaderElector(coordination_v1, "mysql-operator", lease_namespace, self.identity)
+        metrics.QUEUE_DEPTH.set_function(lambda: len(self.queue))
+
+        # Манифесты CR кэшируются до изменения generation
+        self.renderer = ManifestRenderer(overlays)
+        self.hostpath_renderer = ManifestRenderer(hostpath_overlays(overlays)) if hostpath_pv else None
+
+        # Готовность MySQL - по событиям Deployment/StatefulSet, таймауты - на одном колесе таймеров
+        self.readiness = ReadinessTracker(self._enqueue_known, timeout=ready_timeout)
+        metrics.READINESS_PENDING.set_function(lambda: len(self.readiness.wheel))
+
+        # Массовое создание CR: новые CR копятся в пачку и создаются
+        # параллельно, по kind; одиночные CR идут через обычную очередь
+        self.bulk = None
+        self.bulk_window = None
+        self.bulk_min_batch = bulk_min_batch
+        if bulk_in_flight:
+            self.bulk = BulkProvisioner(self.ensure_resource, in_flight=bulk_in_flight, prepare=self._prepare_bulk)
+            self.bulk_window = BatchWindow(self._provision_batch)
+
+    def _informer(self, kind, api_version, plural, **kwargs):
+        """Informer на весь кластер или по одному на каждый namespace из списка"""
+        list_func = lister(self.apply_engine.client, api_version, plural)
+        if self.namespaces is None:
+            return Informer(kind, list_func, **kwargs)
+        return NamespacedInformers(kind, list_func, self.namespaces, **kwargs)
+
+    def _uses_hostpath(self, spec):
+        return self.hostpath_pv and uses_hostpath(spec)
+
+    def render(self, name, namespace, spec, owner=None):
+        """Дочерние манифесты CR; с hostPath - сначала PV, PVC привязан к нему"""
+        if not self._uses_hostpath(spec):
+            return self.renderer.render_all(name, namespace, spec, owner)
+        return [
+            render_pv(name, spec.get('storageSize', '1Gi')),
+            *self.hostpath_renderer.render_all(name, namespace, spec, owner)
+        ]
+
+    def _set_finalizers(self, name, namespace, finalizers):
+        """Замена списка финализаторов CR"""
+        with metrics.api_call("patch", self.plural):
+            self.custom_api.patch_namespaced_custom_object(
+                group=self.group,
+                version=self.version,
+                namespace=namespace,
+                plural=self.plural,
+                name=name,
+                body={"metadata": {"finalizers": finalizers}}
+            )
+
+    def _live_mysql(self, name, namespace, uid):
+        """CR из API в обход кэша; None, если его нет или это новый CR с тем же именем"""
         try:
-            self.v1.create_namespaced_service(namespace, service_manifest)
-            logger.info(f"Service {name}-mysql-service created")
+            with metrics.api_call("get", self.plural):
+                live = self.custom_api.get_namespaced_custom_object(
+                    group=self.group,
+                    version=self.version,
+                    namespace=namespace,
+                    plural=self.plural,
+                    name=name
+                )
         except ApiException as e:
-            logger.error(f"Error creating service: {e}")
+            if e.status == 404:
+                return None
             raise
-    
-    def create_pv_pvc(self, name, namespace, storage_size):
-        """Создание PV и PVC для MySQL"""
-        
-        # Создание PersistentVolumeClaim
-        pvc_manifest = {
-            "apiVersion": "v1",
-            "kind": "PersistentVolumeClaim",
-            "metadata": {
-                "name": f"{name}-mysql-pvc",
-                "namespace": namespace
-            },
-            "spec": {
-                "accessModes": ["ReadWriteOnce"],
-                "resources": {
-                    "requests": {
-                        "storage": storage_size
-                    }
-                }
-            }
-        }
-        
+        return live if live['metadata'].get('uid') == uid else None
+
+    def _finalize(self, name, namespace, obj):
+        """Удаляемый CR: hostPath PV удаляется до снятия финализатора"""
+        finalizers = obj['metadata'].get('finalizers') or []
+        if PV_FINALIZER not in finalizers:
+            return
+        self.apply_engine.delete(render_pv(name, obj.get('spec', {}).get('storageSize', '1Gi')))
+        logger.info(f"Deleted {resource_name('PersistentVolume', name)}")
+        self._set_finalizers(name, namespace, [f for f in finalizers if f != PV_FINALIZER])
+        logger.info(f"Released finalizer for MySQL: {name}")
+
+    def _is_up_to_date(self, manifest):
+        """Совпадает ли объект в кэше с отрендеренным манифестом.
+
+        spec-hash ловит изменения CR, сравнение полей - правки объекта
+        в обход оператора (kubectl scale/edit).
+        """
+        metadata = manifest['metadata']
+        live = self.informers[manifest['kind']].get(metadata.get('namespace'), metadata['name'])
+        if live is None:
+            return False
+        live_hash = (live['metadata'].get('annotations') or {}).get(SPEC_HASH_ANNOTATION)
+        if live_hash != metadata['annotations'][SPEC_HASH_ANNOTATION]:
+            return False
+        return not has_drifted(manifest, live)
+
+    def ensure_resource(self, manifest):
+        """Server-side apply объекта, если он отсутствует или устарел (по spec-hash)"""
+        if self._is_up_to_date(manifest):
+            return
+
+        kind = manifest['kind']
+        name = manifest['metadata']['name']
         try:
-            self.v1.create_namespaced_persistent_volume_claim(namespace, pvc_manifest)
-            logger.info(f"PVC {name}-mysql-pvc created")
+            self.apply_engine.apply(manifest)
+            logger.info(f"{kind} {name} applied")
         except ApiException as e:
-            logger.error(f"Error creating PVC: {e}")
+            # StorageClass без allowVolumeExpansion и т.п.: повтор не поможет,
+            # остальные объекты CR применяются, причина - в StorageResized
+            if kind == "PersistentVolumeClaim" and e.status in (403, 422) and self._is_expansion(manifest):
+                self._reject_expansion(manifest, error_message(e))
+                return
+            logger.error(f"Error applying {kind} {name}: {e}")
             raise
-    
-    def delete_resources(self, name, namespace):
-        """Удаление всех созданных ресурсов"""
-        
-        resources = [
-            (self.v1.delete_namespaced_secret, f"{name}-mysql-secret", namespace),
-            (self.apps_v1.delete_namespaced_deployment, f"{name}-mysql", namespace),
-            (self.v1.delete_namespaced_service, f"{name}-mysql-service", namespace),
-            (self.v1.delete_namespaced_persistent_volume_claim, f"{name}-mysql-pvc", namespace),
+
+    def _live_pvc(self, manifest):
+        metadata = manifest['metadata']
+        return self.informers["PersistentVolumeClaim"].get(metadata['namespace'], metadata['name'])
+
+    def _is_expansion(self, manifest):
+        """Увеличивает ли манифест объем существующего PVC"""
+        live = self._live_pvc(manifest)
+        return live is not None and (
+            parse_quantity(manifest['spec']['resources']['requests']['storage'])
+            > parse_quantity(live['spec']['resources']['requests']['storage'])
+        )
+
+    def _reject_expansion(self, manifest, message):
+        metadata = manifest['metadata']
+        key = f"{metadata['namespace']}/{metadata['labels']['instance']}"
+        requested = manifest['spec']['resources']['requests']['storage']
+        self._expansion_rejected.setdefault(key, {})[metadata['name']] = (requested, message)
+        logger.warning(f"PVC {metadata['name']} cannot be expanded to {requested}: {message}")
+
+    def _rejected(self, manifest):
+        """Отказ API сервера в расширении PVC до того же объема или None"""
+        metadata = manifest['metadata']
+        key = f"{metadata['namespace']}/{metadata['labels']['instance']}"
+        return self._expansion_rejected.get(key, {}).get(metadata['name'])
+
+    def _storage_blocked(self, manifest):
+        """PVC, который нельзя применить (смена класса, уменьшение, расширение): причина в status"""
+        if manifest['kind'] == "PersistentVolume":
+            # Статический hostPath PV не меняет размер после создания: его PVC не расширить
+            live = self.informers["PersistentVolume"].get(None, manifest['metadata']['name'])
+            return live is not None and not same_quantity(
+                manifest['spec']['capacity']['storage'], (live['spec'].get('capacity') or {}).get('storage')
+            )
+        if manifest['kind'] != "PersistentVolumeClaim":
+            return False
+        error = storage.change_error(manifest, self._live_pvc(manifest), self._rejected(manifest))
+        if error is not None:
+            logger.warning(f"PVC {manifest['metadata']['name']} is not applied: {error[1]}")
+        return error is not None
+
+    def _keep_immutable(self, manifest):
+        """volumeClaimTemplates StatefulSet неизменяемы: остаются как в кластере.
+
+        Размер томов существующих pod меняется через их PVC (render_replica_pvcs).
+        """
+        if manifest['kind'] != "StatefulSet":
+            return manifest
+        metadata = manifest['metadata']
+        live = self.informers["StatefulSet"].get(metadata['namespace'], metadata['name'])
+        if live is None:
+            return manifest
+        spec = dict(manifest['spec'], volumeClaimTemplates=live['spec']['volumeClaimTemplates'])
+        return dict(manifest, spec=spec)
+
+    def sync_mysql(self, name, namespace, spec, owner=None):
+        """Приведение дочерних объектов CR к spec (исключения пробрасываются).
+
+        Возвращает False, если все объекты уже соответствуют spec.
+        """
+        manifests = [
+            self._keep_immutable(manifest)
+            for manifest in self.render(name, namespace, spec, owner)
+            if not self._storage_blocked(manifest)
         ]
-        
-        for delete_func, resource_name, ns in resources:
-            try:
-                delete_func(resource_name, ns)
-                logger.info(f"Resource {resource_name} deleted")
-            except ApiException as e:
-                if e.status != 404:  # 404 - ресурс не найден
-                    logger.error(f"Error deleting {resource_name}: {e}")
-    
-    def _encode_base64(self, text):
-        """Кодирование строки в base64"""
-        import base64
-        return base64.b64encode(text.encode()).decode()
-    
-    def handle_mysql_cr(self, event):
-        """Обработка событий MySQL Custom Resource"""
-        
-        obj = event['object']
-        metadata = obj.get('metadata', {})
-        spec = obj.get('spec', {})
-        
-        name = metadata.get('name')
-        namespace = metadata.get('namespace', 'default')
-        
-        logger.info(f"Processing MySQL CR: {name} in namespace {namespace}")
-        
-        if event['type'] == 'ADDED' or event['type'] == 'MODIFIED':
-            try:
-                # Создаем ресурсы в правильном порядке
-                self.create_pv_pvc(name, namespace, spec.get('storageSize', '1Gi'))
-                self.create_deployment(name, namespace, spec)
-                self.create_service(name, namespace)
-                
-                logger.info(f"Successfully created resources for MySQL CR: {name}")
-                
-            except Exception as e:
-                logger.error(f"Error creating resources for {name}: {e}")
-        
-        elif event['type'] == 'DELETED':
+
+        # Все объекты соответствуют spec - никаких записей в API
+        if all(self._is_up_to_date(manifest) for manifest in manifests):
+            logger.debug(f"Resources for MySQL CR {name} are up to date")
+            return False
+
+        # Создаем ресурсы в правильном порядке
+        for manifest in manifests:
+            self.ensure_resource(manifest)
+
+        logger.info(f"Successfully reconciled resources for MySQL CR: {name}")
+        return True
+
+    def _workload_ready(self, name, namespace, kind):
+        """Готовы ли pod CR (Deployment или StatefulSet) по данным кэша"""
+        return workload_ready(self.informers[kind].get(namespace, resource_name(kind, name)))
+
+    def reconcile(self, key):
+        """Обработка ключа из очереди по актуальному состоянию из кэша"""
+        if not self._owns(key):
+            return
+
+        namespace, name = split_key(key)
+        obj = self.mysqls.get_by_key(key)
+
+        # Причина reconcile - в поле event записей лога; без причины - resync или повтор
+        trigger = self._triggers.pop(key, "requeue")
+        with logs.reconcile_context(key, trigger), metrics.ReconcileTimer() as timer:
+            if obj is None:
+                # Дочерние объекты удаляет сборщик мусора по ownerReferences
+                logger.info(f"MySQL CR {name} deleted, dependents are garbage collected")
+                self.readiness.forget(key)
+                self._confirm_live.discard(key)
+                self._expansion_rejected.pop(key, None)
+                timer.outcome = "deleted"
+                return
+            if key in self._confirm_live:
+                # Флаг снимается до GET: удаление во время проверки поставит его снова
+                self._confirm_live.discard(key)
+                try:
+                    obj = self._live_mysql(name, namespace, obj['metadata'].get('uid'))
+                except Exception:
+                    self._confirm_live.add(key)
+                    raise
+                if obj is None:
+                    logger.info(f"MySQL CR {name} is already deleted, cache is behind: dependents are not re-created")
+                    timer.outcome = "deleted"
+                    return
+            if obj['metadata'].get('deletionTimestamp'):
+                # Дочерние объекты удалит сборщик мусора, hostPath PV - мы
+                self._finalize(name, namespace, obj)
+                timer.outcome = "deleted"
+                return
+            finalizers = obj['metadata'].get('finalizers') or []
+            if self._uses_hostpath(obj.get('spec', {})) and PV_FINALIZER not in finalizers:
+                self._set_finalizers(name, namespace, finalizers + [PV_FINALIZER])
+
+            # Все изменения status за reconcile - одним patch в конце
+            status = StatusWriter(obj)
+            status.set(observedGeneration=obj['metadata'].get('generation'))
             try:
-                self.delete_resources(name, namespace)
-                logger.info(f"Successfully deleted resources for MySQL CR: {name}")
+                if not self.sync_mysql(name, namespace, obj.get('spec', {}), obj):
+                    timer.outcome = "noop"
+            except ValueError as e:
+                # Ошибка в spec: повтор не поможет, следующий reconcile - по изменению CR
+                logger.error(f"Invalid spec of MySQL CR {name}: {e}")
+                timer.outcome = "error"
+                status.set(phase=PHASE_FAILED)
+                status.set_condition("Synced", "False", "InvalidSpec", error_message(e))
+                self.write_status(status)
+                return
             except Exception as e:
-                logger.error(f"Error deleting resources for {name}: {e}")
-    
+                status.set(phase=PHASE_FAILED)
+                status.set_condition("Synced", "False", "ApplyFailed", error_message(e))
+                self.write_status(status)
+                raise
+
+            kind = workload_kind(obj.get('spec', {}))
+            ready = self._workload_ready(name, namespace, kind)
+            if ready:
+                self.readiness.ready(key)
+            else:
+                self.readiness.track(key, obj['metadata'].get('generation'))
+
+            # Расширение PVC идет асинхронно: прогресс по status PVC из кэша
+            pvc = next(
+                manifest for manifest in self.render(name, namespace, obj.get('spec', {}), obj)
+                if manifest['kind'] == "PersistentVolumeClaim"
+            )
+            live_pvc = self.informers["PersistentVolumeClaim"].get(namespace, pvc['metadata']['name'])
+
+            status.set(
+                phase=PHASE_READY if ready else PHASE_PROVISIONING,
+                **endpoints(name, namespace, obj.get('spec', {})),
+                storage=storage.storage_status(pvc, live_pvc)
+            )
+            status.set_condition("Synced", "True", "ResourcesApplied")
+            status.set_condition("StorageResized", *storage.resize_condition(pvc, live_pvc, self._rejected(pvc)))
+            if ready:
+                status.set_condition("Ready", "True", f"{kind}Ready")
+            elif self.readiness.timed_out(key):
+                status.set_condition(
+                    "Ready", "False", "ReadinessTimeout",
+                    f"MySQL is not accepting connections after {self.readiness.timeout:g}s"
+                )
+            else:
+                status.set_condition("Ready", "False", f"{kind}NotReady")
+            self.write_status(status)
+
+    def write_status(self, status):
+        """Запись status CR (не более одного patch за reconcile)"""
+        try:
+            status.flush(self.custom_api, self.group, self.version, self.plural)
+        except ApiException as e:
+            # CR удален во время reconcile - status писать некуда
+            if e.status != 404:
+                raise
+
+    def _owns(self, key):
+        """Обрабатывает ли эта реплика данный CR (всегда да без шардирования)"""
+        return self.shard is None or self.shard.owns(key)
+
+    def _requeue_owned(self):
+        """Смена состава реплик: в очередь все CR, доставшиеся этой реплике"""
+        for key in self.mysqls.keys():
+            if self._owns(key):
+                self.queue.add(key)
+
+    def _is_new(self, obj):
+        """Новый CR: ни одного дочернего объекта еще нет"""
+        return not any(informer.by_index(object_key(obj)) for informer in self.informers.values())
+
+    def _prepare_bulk(self, key, manifests):
+        """Финализатор до создания hostPath PV: иначе PV CR, удаленного до
+        первого reconcile, никто не удалит"""
+        if not any(manifest['kind'] == "PersistentVolume" for manifest in manifests):
+            return
+        obj = self.mysqls.get_by_key(key)
+        if obj is None:
+            raise LookupError(f"MySQL CR {key} is deleted")
+        finalizers = obj['metadata'].get('finalizers') or []
+        if PV_FINALIZER not in finalizers:
+            namespace, name = split_key(key)
+            self._set_finalizers(name, namespace, finalizers + [PV_FINALIZER])
+
+    def _provision_batch(self, keys):
+        """Пачка новых CR: bulk provisioning, затем обычный reconcile каждого"""
+        if len(keys) >= self.bulk_min_batch and (self.elector is None or self.elector.is_leader):
+            batch = {}
+            for key in keys:
+                obj = self.mysqls.get_by_key(key)
+                if obj is not None and self._owns(key):
+                    namespace, name = split_key(key)
+                    try:
+                        batch[key] = self.render(name, namespace, obj.get('spec', {}), obj)
+                    except ValueError:
+                        # Ошибку в spec (например, неизвестный profile) в status запишет reconcile
+                        continue
+            self.bulk.provision(batch)
+        # reconcile запишет status и повторит создание для CR с ошибками
+        for key in keys:
+            self.queue.add(key)
+
+    def _on_mysql_event(self, event_type, obj, old):
+        """Событие informer'а MySQL CR: ставим ключ в очередь"""
+        # При запуске: _is_new и bulk provisioning смотрят в кэш дочерних объектов
+        self._children_synced.wait()
+        if event_type == 'DELETED':
+            self.renderer.forget(obj['metadata'].get('uid'))
+            if self.hostpath_renderer is not None:
+                self.hostpath_renderer.forget(obj['metadata'].get('uid'))
+        # Запись status (в том числе нашим reconcile) не меняет generation
+        if not needs_reconcile(event_type, obj):
+            return
+        key = object_key(obj)
+        if not self._owns(key):
+            return
+        self._triggers[key] = event_type
+        if self.bulk_window is not None and event_type == 'ADDED' and self._is_new(obj):
+            self.bulk_window.add(key)
+        else:
+            self.queue.add(key)
+
+    def _enqueue_known(self, key, trigger="readiness", confirm=False):
+        """В очередь ключ существующего CR этой реплики (confirm - проверить CR в API)"""
+        # Дочерние объекты удаленного CR удаляет сборщик мусора
+        if self.mysqls.get_by_key(key) is not None and self._owns(key):
+            self._triggers[key] = trigger
+            if confirm:
+                self._confirm_live.add(key)
+            self.queue.add(key)
+
+    def _on_child_event(self, kind, event_type, obj, old):
+        """Событие дочернего объекта kind: в очередь ключ его MySQL CR"""
+        metadata = obj.get('metadata', {})
+        if event_type != 'DELETED':
+            # Новый spec-hash - это наш же apply, reconcile о нем уже знает
+            new_hash = (metadata.get('annotations') or {}).get(SPEC_HASH_ANNOTATION)
+            old_hash = ((old or {}).get('metadata', {}).get('annotations') or {}).get(SPEC_HASH_ANNOTATION)
+            if new_hash is not None and new_hash != old_hash:
+                return
+            # Изменился только status Deployment/StatefulSet (generation та же):
+            # готовность отслеживает ReadinessTracker. Status PVC (расширение тома) нужен reconcile
+            generation = metadata.get('generation')
+            if (kind in ("Deployment", "StatefulSet") and generation is not None and old is not None
+                    and old['metadata'].get('generation') == generation):
+                return
+
+        owner = next(
+            (ref['name'] for ref in metadata.get('ownerReferences') or []
+             if ref.get('kind') == 'MySQL' and ref.get('controller')),
+            (metadata.get('labels') or {}).get('instance')
+        )
+        self._enqueue_known(
+            f"{metadata.get('namespace')}/{owner}",
+            f"{kind} {event_type}",
+            confirm=event_type == 'DELETED'
+        )
+
+    def _on_lost_leadership(self):
+        # Как и в client-go: без аренды процесс завершается, под перезапустится
+        logger.error("Leader election lost, exiting")
+        logs.shutdown()
+        os._exit(1)
+
+    def _debug_sources(self):
+        """Разделы /debug/state"""
+        return {
+            "queue": self.queue.snapshot,
+            "triggers": lambda: dict(self._triggers),
+            "reconciles": logs.active_reconciles,
+            "watches": lambda: [
+                state for informer in (self.mysqls, *self.informers.values()) for state in informer.snapshot()
+            ],
+            "readiness": self.readiness.snapshot,
+            "leadership": lambda: {
+                "identity": self.identity,
+                "leader": None if self.elector is None else self.elector.is_leader,
+                "shard_members": None if self.shard is None else list(self.shard.members),
+            },
+        }
+
     def run(self):
         """Запуск оператора"""
         logger.info("Starting MySQL Operator...")
-        
-        w = watch.Watch()
-        
-        while True:
-            try:
-                # Отслеживание событий для MySQL Custom Resources
-                for event in w.stream(
-                    self.custom_api.list_cluster_custom_object,
-                    group=self.group,
-                    version=self.version,
-                    plural=self.plural
-                ):
-                    self.handle_mysql_cr(event)
-                    
-            except ApiException as e:
-                logger.error(f"API exception: {e}")
-                time.sleep(10)
-            except Exception as e:
-                logger.error(f"Unexpected error: {e}")
-                time.sleep(10)
+        metrics.start_metrics_server(self.metrics_port)
+        if self.debug_port:
+            from debug import DebugServer
+            DebugServer(self.debug_port, self._debug_sources(), self.debug_address).start()
+
+        # Сначала наполняем кэш дочерних объектов, чтобы первый reconcile
+        # не отправлял create для уже существующих ресурсов. list MySQL CR
+        # идет параллельно, его события ждут в _on_mysql_event
+        for informer in self.informers.values():
+            informer.start()
+        self.mysqls.add_handler(self._on_mysql_event)
+        self.mysqls.start()
+        for kind, informer in self.informers.items():
+            informer.wait_for_sync()
+            # Удаление или ручная правка дочернего объекта - reconcile его CR
+            informer.add_handler(functools.partial(self._on_child_event, kind))
+        self.informers["Deployment"].add_handler(self.readiness.on_workload)
+        self.informers["StatefulSet"].add_handler(self.readiness.on_workload)
+        self.readiness.start()
+        metrics.observe_caches_synced()
+
+        if self.shard is not None:
+            self.shard.start()
+        if self.resyncer is not None:
+            self.resyncer.start()
+        if self.bulk_window is not None:
+            self.bulk_window.start()
+        if self.elector is not None:
+            # Кэши наполняются и в режиме ожидания, воркеры - только у лидера
+            self.elector.start(self.worker_pool.start, self._on_lost_leadership)
+        else:
+            self.worker_pool.start()
+
+        self._children_synced.set()
+        try:
+            self.mysqls.join()
+        finally:
+            if self.shard is not None:
+                self.shard.stop()
+
+
+
+def main(argv=None):
+    """Точка входа: настройки из аргументов и окружения (settings.py)"""
+    args = settings.parse_args(argv)
+    if threading.current_thread() is threading.main_thread():
+        # Остановка pod (SIGTERM) - через SystemExit: срабатывают finally и atexit
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    overlays = load_overlays(args.manifest_overlays) if args.manifest_overlays else None
+    if args.runtime == settings.RUNTIME_ASYNC:
+        import asyncio
+        from async_operator import AsyncMySQLOperator
+        operator = AsyncMySQLOperator(
+            concurrency=args.workers,
+            pool_size=args.connection_pool_size,
+            metrics_port=args.metrics_port,
+            overlays=overlays,
+            debug_port=args.debug_port,
+            debug_address=args.debug_address,
+            api_qps=args.api_qps,
+            api_burst=args.api_burst
+        )
+        asyncio.run(operator.run())
+        return
+
+    MySQLOperator(
+        workers=args.workers,
+        qps=args.reconcile_qps,
+        burst=args.reconcile_burst,
+        metrics_port=args.metrics_port,
+        leader_election=args.leader_elect,
+        shard_by=args.shard_by,
+        identity=args.identity,
+        lease_namespace=args.lease_namespace,
+        namespaces=args.namespaces,
+        resync_period=args.resync_period,
+        overlays=overlays,
+        bulk_in_flight=args.bulk_in_flight,
+        ready_timeout=args.ready_timeout,
+        debug_port=args.debug_port,
+        debug_address=args.debug_address,
+        api_qps=args.api_qps,
+        api_burst=args.api_burst,
+        hostpath_pv=args.hostpath_pv
+    ).run()
+
 
 if __name__ == '__main__':
-    operator = MySQLOperator()
-    operator.run()
\ No newline at end of file
+    main()
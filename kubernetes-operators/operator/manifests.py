@@ -0,0 +1,709 @@
+#!/usr/bin/env python3
+
+from collections import OrderedDict
+from string import Template
+import base64
+import copy
+import hashlib
+import json
+import os
+import threading
+
+import yaml
+
+import profiles
+
+# Хэш отрендеренного манифеста, по нему пропускаются no-op reconcile
+SPEC_HASH_ANNOTATION = "otus.homework/spec-hash"
+# Хэш my.cnf в шаблоне pod: изменение конфигурации перезапускает MySQL
+CONFIG_HASH_ANNOTATION = "otus.homework/config-hash"
+
+
+def spec_hash(manifest):
+    """Стабильный хэш манифеста (без аннотации spec-hash)"""
+    manifest = dict(manifest, metadata=dict(manifest['metadata']))
+    annotations = dict(manifest['metadata'].get('annotations') or {})
+    annotations.pop(SPEC_HASH_ANNOTATION, None)
+    manifest['metadata']['annotations'] = annotations
+    data = json.dumps(manifest, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+# Поля с quantity (resources контейнера и PVC, capacity PV): сервер приводит
+# их к канонической записи (1.5Gi -> 1536Mi, 0.5 -> 500m, 1024Mi -> 1Gi)
+QUANTITY_FIELDS = ("resources", "capacity")
+
+
+def same_quantity(desired, live):
+    """Равны ли quantity в разной записи"""
+    try:
+        return profiles.quantity_value(desired) == profiles.quantity_value(live)
+    except ValueError:
+        return False
+
+
+def is_subset(desired, live, quantities=False):
+    """Содержится ли desired в live: поля, добавленные сервером, не учитываются.
+
+    Внутри QUANTITY_FIELDS значения сравниваются как числа, иначе запись
+    пользователя, отличная от канонической, - вечный drift и apply.
+    """
+    if isinstance(desired, dict):
+        return isinstance(live, dict) and all(
+            is_subset(value, live.get(key), quantities or key in QUANTITY_FIELDS)
+            for key, value in desired.items()
+        )
+    if isinstance(desired, list):
+        return (
+            isinstance(live, list)
+            and len(desired) == len(live)
+            and all(is_subset(d, l, quantities) for d, l in zip(desired, live))
+        )
+    if quantities and desired != live and isinstance(desired, (str, int, float)) and isinstance(live, str):
+        return same_quantity(desired, live)
+    return desired == live
+
+
+def has_drifted(manifest, live):
+    """Изменен ли объект в кластере в обход оператора (scale, правка spec и т.п.)"""
+    labels = manifest['metadata'].get('labels') or {}
+    if not is_subset(labels, live['metadata'].get('labels') or {}):
+        return True
+    return any(
+        not is_subset(value, live.get(key))
+        for key, value in manifest.items()
+        if key not in ('apiVersion', 'kind', 'metadata')
+    )
+
+
+# Имена дочерних объектов CR - единые для всех вариантов оператора
+NAME_FORMATS = {
+    "Secret": "{}-mysql-secret",
+    "ConfigMap": "{}-mysql-config",
+    "PersistentVolumeClaim": "{}-mysql-pvc",
+    "PersistentVolume": "{}-mysql-pv",
+    "Deployment": "{}-mysql",
+    "StatefulSet": "{}-mysql",
+    "Service": "{}-mysql-service",
+}
+
+# Service реплицированной топологии по ролям
+SERVICE_NAME_FORMATS = {
+    "headless": "{}-mysql-headless",
+    "primary": "{}-mysql-primary",
+    "read": "{}-mysql-read",
+}
+
+TOPOLOGY_STANDALONE = "standalone"
+TOPOLOGY_REPLICATED = "replicated"
+
+
+def resource_name(kind, name):
+    """Имя дочернего объекта kind для MySQL CR name"""
+    return NAME_FORMATS[kind].format(name)
+
+
+def service_name(name, role):
+    """Имя Service роли role (primary, read, headless) для MySQL CR name"""
+    return SERVICE_NAME_FORMATS[role].format(name)
+
+
+def replica_pvc_name(name, ordinal):
+    """Имя PVC pod ordinal из volumeClaimTemplates StatefulSet"""
+    return f"mysql-storage-{resource_name('StatefulSet', name)}-{ordinal}"
+
+
+def topology(spec):
+    """spec.topology с проверкой spec.replicas"""
+    value = spec.get('topology', TOPOLOGY_STANDALONE)
+    if value not in (TOPOLOGY_STANDALONE, TOPOLOGY_REPLICATED):
+        raise ValueError(f"Unknown topology {value!r}, expected standalone or replicated")
+    if value == TOPOLOGY_STANDALONE and spec.get('replicas', 1) != 1:
+        raise ValueError("replicas > 1 requires topology: replicated")
+    return value
+
+
+def workload_kind(spec):
+    """Kind объекта с pod MySQL для topology CR"""
+    return "StatefulSet" if topology(spec) == TOPOLOGY_REPLICATED else "Deployment"
+
+
+def encode_base64(text):
+    """Кодирование строки в base64"""
+    return base64.b64encode(text.encode()).decode()
+
+
+def labels(name):
+    return {"app": "mysql", "instance": name}
+
+
+# Все дочерние объекты оператора помечены app=mysql и instance=<имя CR>;
+# в кэш попадают только они, а не все Deployment/Service кластера
+LABEL_SELECTOR = "app=mysql,instance"
+
+
+class Skeleton:
+    """Неизменяемая основа манифеста, сериализованная один раз.
+
+    instantiate() возвращает новую копию: json.loads заметно дешевле
+    deepcopy и построения вложенного dict заново.
+    """
+
+    def __init__(self, manifest):
+        self._data = json.dumps(manifest)
+
+    def instantiate(self, name, namespace, instance):
+        manifest = json.loads(self._data)
+        metadata = manifest['metadata']
+        metadata['name'] = name
+        if namespace is not None:
+            metadata['namespace'] = namespace
+        metadata['labels'] = labels(instance)
+        return manifest
+
+
+SECRET = Skeleton({
+    "apiVersion": "v1",
+    "kind": "Secret",
+    "metadata": {},
+    "type": "Opaque",
+})
+
+# Контейнер MySQL - общий для Deployment и StatefulSet
+CONTAINER = {
+    "name": "mysql",
+    "env": [
+        {
+            "name": "MYSQL_ROOT_PASSWORD",
+            "valueFrom": {"secretKeyRef": {"key": "root-password"}}
+        },
+        {"name": "MYSQL_DATABASE"},
+        {"name": "MYSQL_USER"},
+        {
+            "name": "MYSQL_PASSWORD",
+            "valueFrom": {"secretKeyRef": {"key": "password"}}
+        }
+    ],
+    "ports": [{
+        "containerPort": 3306,
+        "name": "mysql"
+    }],
+    "volumeMounts": [
+        {
+            "name": "mysql-storage",
+            "mountPath": "/var/lib/mysql"
+        },
+        {
+            "name": "mysql-config",
+            "mountPath": "/etc/mysql/conf.d/operator.cnf",
+            "subPath": "operator.cnf"
+        }
+    ],
+    # Первый запуск: entrypoint инициализирует datadir временным сервером с
+    # --skip-networking, по TCP MySQL недоступен все это время (у large с
+    # innodb_log_file_size=1280M - минуты). readiness и liveness начинаются
+    # только после startupProbe, которая ждет до 10 минут
+    "startupProbe": {
+        "exec": {"command": [
+            "sh", "-c",
+            'mysqladmin ping -h 127.0.0.1 -uroot -p"$MYSQL_ROOT_PASSWORD"'
+        ]},
+        "periodSeconds": 10,
+        "timeoutSeconds": 5,
+        "failureThreshold": 60
+    },
+    # Готов - принимает соединения по TCP; жив - отвечает на ping
+    "readinessProbe": {
+        "exec": {"command": [
+            "sh", "-c",
+            'mysql -h 127.0.0.1 -uroot -p"$MYSQL_ROOT_PASSWORD" -e "SELECT 1"'
+        ]},
+        "periodSeconds": 5,
+        "timeoutSeconds": 3
+    },
+    "livenessProbe": {
+        "exec": {"command": [
+            "sh", "-c",
+            'mysqladmin ping -h 127.0.0.1 -uroot -p"$MYSQL_ROOT_PASSWORD"'
+        ]},
+        "periodSeconds": 10,
+        "timeoutSeconds": 5,
+        "failureThreshold": 3
+    }
+}
+
+DEPLOYMENT = Skeleton({
+    "apiVersion": "apps/v1",
+    "kind": "Deployment",
+    "metadata": {},
+    "spec": {
+        "replicas": 1,
+        "selector": {},
+        "template": {
+            "metadata": {},
+            "spec": {
+                "containers": [CONTAINER],
+                "volumes": [
+                    {
+                        "name": "mysql-storage",
+                        "persistentVolumeClaim": {}
+                    },
+                    {
+                        "name": "mysql-config",
+                        "configMap": {}
+                    }
+                ]
+            }
+        }
+    }
+})
+
+# Pod 0 - primary, остальные - асинхронные реплики (GTID auto-position).
+# server-id - из порядкового номера pod, реплики только для чтения
+REPLICA_COMMAND = [
+    "sh", "-c",
+    'ordinal=${HOSTNAME##*-}; '
+    'exec docker-entrypoint.sh mysqld --server-id=$((100 + ordinal)) '
+    '$([ "$ordinal" = 0 ] || echo --read-only)'
+]
+
+# Выполняется entrypoint образа mysql один раз, при инициализации пустого
+# datadir: на primary создается пользователь репликации, на реплике
+# удаляется созданное entrypoint (придет с primary) и настраивается источник
+REPLICATION_INIT = """ordinal=${HOSTNAME##*-}
+if [ "$ordinal" = 0 ]; then
+  docker_process_sql <<EOSQL
+CREATE USER IF NOT EXISTS 'repl'@'%' IDENTIFIED BY '${MYSQL_REPLICATION_PASSWORD}';
+GRANT REPLICATION SLAVE ON *.* TO 'repl'@'%';
+EOSQL
+else
+  docker_process_sql <<EOSQL
+SET SESSION sql_log_bin = 0;
+DROP USER IF EXISTS '${MYSQL_USER}'@'%';
+DROP DATABASE IF EXISTS \\`${MYSQL_DATABASE}\\`;
+RESET MASTER;
+CHANGE REPLICATION SOURCE TO
+  SOURCE_HOST='${MYSQL_PRIMARY_HOST}',
+  SOURCE_USER='repl',
+  SOURCE_PASSWORD='${MYSQL_REPLICATION_PASSWORD}',
+  SOURCE_AUTO_POSITION=1,
+  SOURCE_CONNECT_RETRY=10,
+  GET_SOURCE_PUBLIC_KEY=1;
+EOSQL
+fi
+"""
+
+# Параметры my.cnf, без которых репликация по GTID не работает
+REPLICATION_CONFIG = {
+    "gtid_mode": "ON",
+    "enforce_gtid_consistency": "ON",
+    "log_replica_updates": "ON",
+}
+
+STATEFULSET = Skeleton({
+    "apiVersion": "apps/v1",
+    "kind": "StatefulSet",
+    "metadata": {},
+    "spec": {
+        "selector": {},
+        "podManagementPolicy": "OrderedReady",
+        "template": {
+            "metadata": {},
+            "spec": {
+                "containers": [dict(
+                    CONTAINER,
+                    command=REPLICA_COMMAND,
+                    env=CONTAINER["env"] + [
+                        {
+                            "name": "MYSQL_REPLICATION_PASSWORD",
+                            "valueFrom": {"secretKeyRef": {"key": "replication-password"}}
+                        },
+                        {"name": "MYSQL_PRIMARY_HOST"}
+                    ],
+                    volumeMounts=CONTAINER["volumeMounts"] + [{
+                        "name": "mysql-config",
+                        "mountPath": "/docker-entrypoint-initdb.d/replication.sh",
+                        "subPath": "replication.sh"
+                    }]
+                )],
+                "volumes": [{
+                    "name": "mysql-config",
+                    "configMap": {}
+                }]
+            }
+        },
+        # PVC mysql-storage-<statefulset>-<N> создает оператор (render_replica_pvcs),
+        # шаблон нужен для монтирования и не меняется после создания
+        "volumeClaimTemplates": [{
+            "metadata": {"name": "mysql-storage"},
+            "spec": {
+                "accessModes": ["ReadWriteOnce"],
+                "resources": {"requests": {}}
+            }
+        }]
+    }
+})
+
+CONFIGMAP = Skeleton({
+    "apiVersion": "v1",
+    "kind": "ConfigMap",
+    "metadata": {},
+})
+
+SERVICE = Skeleton({
+    "apiVersion": "v1",
+    "kind": "Service",
+    "metadata": {},
+    "spec": {
+        "ports": [{
+            "port": 3306,
+            "targetPort": 3306,
+            "protocol": "TCP"
+        }],
+        "type": "ClusterIP"
+    }
+})
+
+PVC = Skeleton({
+    "apiVersion": "v1",
+    "kind": "PersistentVolumeClaim",
+    "metadata": {},
+    "spec": {
+        "accessModes": ["ReadWriteOnce"],
+        "resources": {"requests": {}}
+    }
+})
+
+PV = Skeleton({
+    "apiVersion": "v1",
+    "kind": "PersistentVolume",
+    "metadata": {},
+    "spec": {
+        "storageClassName": "manual",
+        "accessModes": ["ReadWriteOnce"],
+        "persistentVolumeReclaimPolicy": "Retain"
+    }
+})
+
+
+def render_secret(name, namespace, spec):
+    """Манифест Secret с паролями MySQL"""
+    manifest = SECRET.instantiate(resource_name("Secret", name), namespace, name)
+    manifest['data'] = {
+        "root-password": encode_base64(spec.get('rootPassword', 'root')),
+        "password": encode_base64(spec.get('password', 'password'))
+    }
+    if topology(spec) == TOPOLOGY_REPLICATED:
+        manifest['data']['replication-password'] = encode_base64(spec.get('replicationPassword', 'replication'))
+    return manifest
+
+
+def my_cnf(spec):
+    """my.cnf по профилю и ресурсам CR"""
+    memory = profiles.container_memory(profiles.resources(spec))
+    overrides = dict(spec.get('mysqlConfig') or {})
+    if topology(spec) == TOPOLOGY_REPLICATED:
+        overrides = dict(REPLICATION_CONFIG, **overrides)
+    return profiles.render_my_cnf(profiles.mysql_config(memory, overrides))
+
+
+def render_configmap(name, namespace, spec):
+    """Манифест ConfigMap с my.cnf MySQL (и скриптом инициализации реплик)"""
+    manifest = CONFIGMAP.instantiate(resource_name("ConfigMap", name), namespace, name)
+    manifest['data'] = {"operator.cnf": my_cnf(spec)}
+    if topology(spec) == TOPOLOGY_REPLICATED:
+        manifest['data']['replication.sh'] = REPLICATION_INIT
+    return manifest
+
+
+def _configure_pod(workload, name, spec):
+    """Общие для Deployment и StatefulSet поля pod MySQL"""
+    pod = workload['spec']
+    pod['selector']['matchLabels'] = labels(name)
+    pod['template']['metadata']['labels'] = labels(name)
+    config_hash = hashlib.sha256(my_cnf(spec).encode()).hexdigest()[:16]
+    pod['template']['metadata']['annotations'] = {CONFIG_HASH_ANNOTATION: config_hash}
+
+    container = pod['template']['spec']['containers'][0]
+    container['image'] = spec.get('image', 'mysql:8.0')
+    container['resources'] = profiles.resources(spec)
+    env = {var['name']: var for var in container['env']}
+    secret = resource_name("Secret", name)
+    env['MYSQL_ROOT_PASSWORD']['valueFrom']['secretKeyRef']['name'] = secret
+    env['MYSQL_DATABASE']['value'] = spec.get('database', 'mydb')
+    env['MYSQL_USER']['value'] = spec.get('username', 'user')
+    env['MYSQL_PASSWORD']['valueFrom']['secretKeyRef']['name'] = secret
+
+    volumes = {volume['name']: volume for volume in pod['template']['spec']['volumes']}
+    volumes['mysql-config']['configMap']['name'] = resource_name("ConfigMap", name)
+    return env, volumes
+
+
+def render_deployment(name, namespace, spec):
+    """Манифест Deployment для MySQL"""
+    manifest = DEPLOYMENT.instantiate(resource_name("Deployment", name), namespace, name)
+    _, volumes = _configure_pod(manifest, name, spec)
+    volumes['mysql-storage']['persistentVolumeClaim']['claimName'] = resource_name("PersistentVolumeClaim", name)
+    return manifest
+
+
+def render_statefulset(name, namespace, spec):
+    """Манифест StatefulSet реплицированной топологии: pod 0 - primary"""
+    manifest = STATEFULSET.instantiate(resource_name("StatefulSet", name), namespace, name)
+    manifest['spec']['replicas'] = spec.get('replicas', 1)
+    manifest['spec']['serviceName'] = service_name(name, "headless")
+    env, _ = _configure_pod(manifest, name, spec)
+    env['MYSQL_REPLICATION_PASSWORD']['valueFrom']['secretKeyRef']['name'] = resource_name("Secret", name)
+    env['MYSQL_PRIMARY_HOST']['value'] = f"{resource_name('StatefulSet', name)}-0.{service_name(name, 'headless')}"
+
+    claim = manifest['spec']['volumeClaimTemplates'][0]['spec']
+    claim['resources']['requests']['storage'] = spec.get('storageSize', '1Gi')
+    if spec.get('storageClassName') is not None:
+        claim['storageClassName'] = spec['storageClassName']
+    return manifest
+
+
+def render_replica_pvcs(name, namespace, spec):
+    """PVC всех pod StatefulSet: через них работает расширение тома"""
+    manifests = []
+    for ordinal in range(spec.get('replicas', 1)):
+        manifest = render_pvc(name, namespace, spec.get('storageSize', '1Gi'), spec.get('storageClassName'))
+        manifest['metadata']['name'] = replica_pvc_name(name, ordinal)
+        manifests.append(manifest)
+    return manifests
+
+
+def render_replicated_services(name, namespace):
+    """Service реплицированной топологии: headless для DNS pod, primary и read"""
+    headless = SERVICE.instantiate(service_name(name, "headless"), namespace, name)
+    headless['spec']['clusterIP'] = "None"
+    # DNS pod нужен репликам до того, как primary станет готов
+    headless['spec']['publishNotReadyAddresses'] = True
+    headless['spec']['selector'] = labels(name)
+
+    primary = SERVICE.instantiate(service_name(name, "primary"), namespace, name)
+    primary['spec']['selector'] = dict(
+        labels(name), **{"statefulset.kubernetes.io/pod-name": f"{resource_name('StatefulSet', name)}-0"}
+    )
+
+    # Чтение - со всех готовых pod, включая primary
+    read = SERVICE.instantiate(service_name(name, "read"), namespace, name)
+    read['spec']['selector'] = labels(name)
+    return [headless, primary, read]
+
+
+def render_service(name, namespace):
+    """Манифест Service для MySQL"""
+    manifest = SERVICE.instantiate(resource_name("Service", name), namespace, name)
+    manifest['spec']['selector'] = labels(name)
+    return manifest
+
+
+def render_pvc(name, namespace, storage_size, storage_class=None):
+    """Манифест PersistentVolumeClaim для MySQL (без storageClassName - класс по умолчанию)"""
+    manifest = PVC.instantiate(resource_name("PersistentVolumeClaim", name), namespace, name)
+    manifest['spec']['resources']['requests']['storage'] = storage_size
+    if storage_class is not None:
+        manifest['spec']['storageClassName'] = storage_class
+    return manifest
+
+
+def render_pv(name, storage_size):
+    """Манифест hostPath PersistentVolume (cluster-scoped, без ownerReference)"""
+    manifest = PV.instantiate(resource_name("PersistentVolume", name), None, name)
+    manifest['metadata']['labels']['type'] = "local"
+    manifest['spec']['capacity'] = {"storage": storage_size}
+    manifest['spec']['hostPath'] = {"path": f"/data/{resource_name('Deployment', name)}"}
+    manifest['metadata']['annotations'] = {SPEC_HASH_ANNOTATION: spec_hash(manifest)}
+    return manifest
+
+
+# Финализатор CR с hostPath PV: cluster-scoped PV нельзя привязать
+# ownerReference к namespaced MySQL, поэтому его удаляет оператор
+PV_FINALIZER = "otus.homework/pv-cleanup"
+
+# PVC привязывается к hostPath PV, созданному для этого CR
+HOSTPATH_OVERLAYS = {
+    "PersistentVolumeClaim": {
+        "spec": {
+            "storageClassName": "manual",
+            "volumeName": resource_name("PersistentVolume", "$name")
+        }
+    }
+}
+
+
+def uses_hostpath(spec):
+    """Подходит ли CR hostPath PV (иначе PVC получает том от StorageClass).
+
+    Один hostPath PV не подходит для нескольких pod StatefulSet.
+    """
+    return not spec.get("storageClassName") and topology(spec) != TOPOLOGY_REPLICATED
+
+
+def hostpath_overlays(overlays=None):
+    """overlays с привязкой PVC к hostPath PV"""
+    combined = copy.deepcopy(overlays or {})
+    merge_overlay(
+        combined.setdefault("PersistentVolumeClaim", {}),
+        copy.deepcopy(HOSTPATH_OVERLAYS["PersistentVolumeClaim"])
+    )
+    return combined
+
+
+def owner_reference(owner):
+    """ownerReference на MySQL CR: дочерние объекты удаляет сборщик мусора Kubernetes"""
+    metadata = owner['metadata']
+    return {
+        "apiVersion": owner.get('apiVersion', 'otus.homework/v1'),
+        "kind": owner.get('kind', 'MySQL'),
+        "name": metadata['name'],
+        "uid": metadata['uid'],
+        "controller": True,
+        "blockOwnerDeletion": True
+    }
+
+
+def _substitute(value, variables):
+    """Подстановка $name/$namespace во все строки overlay"""
+    if isinstance(value, dict):
+        return {key: _substitute(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_substitute(item, variables) for item in value]
+    if isinstance(value, str):
+        return Template(value).safe_substitute(variables)
+    return value
+
+
+def merge_overlay(base, overlay):
+    """Наложение overlay на манифест.
+
+    dict сливаются рекурсивно, None удаляет поле. Списки объектов с полем
+    name (containers, env, ports, volumes) сливаются по name, как strategic
+    merge patch; остальные списки заменяются целиком.
+    """
+    for key, value in overlay.items():
+        current = base.get(key)
+        if value is None:
+            base.pop(key, None)
+        elif isinstance(value, dict) and isinstance(current, dict):
+            merge_overlay(current, value)
+        elif (isinstance(value, list) and isinstance(current, list)
+              and all(isinstance(item, dict) and 'name' in item for item in value + current)):
+            by_name = {item['name']: item for item in current}
+            for item in value:
+                if item['name'] in by_name:
+                    merge_overlay(by_name[item['name']], item)
+                else:
+                    current.append(copy.deepcopy(item))
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+
+def load_overlays(path):
+    """YAML overlay по kind из файла или каталога (*.yaml, *.yml).
+
+    Каждый документ - частичный манифест с полем kind, например:
+
+        kind: Deployment
+        spec:
+          template:
+            spec:
+              nodeSelector:
+                disktype: ssd
+              containers:
+              - name: mysql
+                args: ["--default-authentication-plugin=mysql_native_password"]
+
+    В строках доступны $name (имя CR) и $namespace.
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, entry)
+            for entry in os.listdir(path)
+            if entry.endswith(('.yaml', '.yml'))
+        )
+    else:
+        files = [path]
+
+    overlays = {}
+    for filename in files:
+        with open(filename) as f:
+            for document in yaml.safe_load_all(f):
+                if not document:
+                    continue
+                document = dict(document)
+                kind = document.pop('kind')
+                document.pop('apiVersion', None)
+                merge_overlay(overlays.setdefault(kind, {}), document)
+    return overlays
+
+
+def render_all(name, namespace, spec, owner=None, overlays=None):
+    """Все дочерние манифесты CR в порядке создания, с аннотацией spec-hash"""
+    if topology(spec) == TOPOLOGY_REPLICATED:
+        manifests = [
+            render_secret(name, namespace, spec),
+            render_configmap(name, namespace, spec),
+            *render_replica_pvcs(name, namespace, spec),
+            render_statefulset(name, namespace, spec),
+            *render_replicated_services(name, namespace),
+        ]
+    else:
+        manifests = [
+            render_secret(name, namespace, spec),
+            render_configmap(name, namespace, spec),
+            render_pvc(name, namespace, spec.get('storageSize', '1Gi'), spec.get('storageClassName')),
+            render_deployment(name, namespace, spec),
+            render_service(name, namespace),
+        ]
+    for manifest in manifests:
+        if owner is not None:
+            manifest['metadata']['ownerReferences'] = [owner_reference(owner)]
+        overlay = (overlays or {}).get(manifest['kind'])
+        if overlay:
+            merge_overlay(manifest, _substitute(overlay, {"name": name, "namespace": namespace}))
+        annotations = manifest['metadata'].setdefault('annotations', {})
+        annotations[SPEC_HASH_ANNOTATION] = spec_hash(manifest)
+    return manifests
+
+
+class ManifestRenderer:
+    """render_all с overlay и LRU кэшем результатов по (uid, generation) CR.
+
+    generation меняется при каждом изменении spec, поэтому resync и
+    повторные события без изменений spec не рендерят манифесты заново.
+    Возвращаемые манифесты общие для всех вызовов - их нельзя изменять.
+    """
+
+    def __init__(self, overlays=None, cache_size=1024):
+        self.overlays = overlays or {}
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render_all(self, name, namespace, spec, owner=None):
+        metadata = (owner or {}).get('metadata', {})
+        key = (metadata.get('uid'), metadata.get('generation'))
+        if None in key:
+            return render_all(name, namespace, spec, owner, self.overlays)
+
+        with self._lock:
+            manifests = self._cache.get(key)
+            if manifests is not None:
+                self._cache.move_to_end(key)
+                return list(manifests)
+
+        manifests = render_all(name, namespace, spec, owner, self.overlays)
+        with self._lock:
+            self._cache[key] = manifests
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(manifests)
+
+    def forget(self, uid):
+        """Удаление из кэша всех версий CR"""
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == uid]:
+                del self._cache[key]
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_DURATION = Histogram(
+    "mysql_operator_reconcile_duration_seconds",
+    "Длительность reconcile одного MySQL CR",
+    ["outcome"]
+)
+RECONCILES_IN_FLIGHT = Gauge(
+    "mysql_operator_reconciles_in_flight",
+    "Reconcile, выполняющиеся в данный момент"
+)
+EVENTS = Counter(
+    "mysql_operator_events_total",
+    "Полученные события watch",
+    ["resource", "type"]
+)
+API_CALLS = Counter(
+    "mysql_operator_api_calls_total",
+    "Запросы к API серверу (code: HTTP статус, например 409/404)",
+    ["verb", "resource", "code"]
+)
+API_CALL_DURATION = Histogram(
+    "mysql_operator_api_call_duration_seconds",
+    "Длительность запросов к API серверу",
+    ["verb", "resource"]
+)
+WATCH_RESTARTS = Counter(
+    "mysql_operator_watch_restarts_total",
+    "Переподключения watch",
+    ["resource", "reason"]
+)
+QUEUE_DEPTH = Gauge(
+    "mysql_operator_workqueue_depth",
+    "Ключи, ожидающие reconcile"
+)
+BULK_PENDING = Gauge(
+    "mysql_operator_bulk_pending_objects",
+    "Объекты текущей пачки bulk provisioning, ожидающие создания"
+)
+READINESS_PENDING = Gauge(
+    "mysql_operator_readiness_pending",
+    "MySQL CR, ожидающие готовности"
+)
+SECONDS_SINCE_LAST_EVENT = Gauge(
+    "mysql_operator_seconds_since_last_event",
+    "Время с последнего события MySQL CR"
+)
+
+CACHES_SYNCED = Gauge(
+    "mysql_operator_startup_caches_synced_seconds",
+    "Время от запуска процесса до синхронизации кэшей дочерних объектов"
+)
+TIME_TO_FIRST_RECONCILE = Gauge(
+    "mysql_operator_time_to_first_reconcile_seconds",
+    "Время от запуска процесса до завершения первого reconcile"
+)
+
+_last_event = time.monotonic()
+SECONDS_SINCE_LAST_EVENT.set_function(lambda: time.monotonic() - _last_event)
+_imported_at = time.monotonic()
+_first_reconcile = False
+
+
+def uptime():
+    """Секунды с запуска процесса, включая старт интерпретатора и импорты.
+
+    Время старта - из /proc/self/stat (в тиках с загрузки системы); вне
+    Linux - от импорта этого модуля.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic() - _imported_at
+
+
+def observe_caches_synced():
+    seconds = uptime()
+    CACHES_SYNCED.set(seconds)
+    logger.info(f"Caches synced {seconds:.3f}s after process start")
+
+
+def start_metrics_server(port):
+    """HTTP /metrics в отдельном потоке; port=0 отключает endpoint"""
+    if port:
+        start_http_server(port)
+        logger.info(f"Metrics endpoint listening on :{port}/metrics")
+
+
+def observe_event(resource, event_type):
+    """Учет события watch"""
+    global _last_event
+    EVENTS.labels(resource, event_type).inc()
+    if resource == "MySQL":
+        _last_event = time.monotonic()
+
+
+@contextmanager
+def api_call(verb, resource):
+    """Учет запроса к API серверу: счетчик по коду ответа и длительность"""
+    start = time.perf_counter()
+    code = "200"
+    try:
+        yield
+    except Exception as e:
+        # ApiException как sync, так и asyncio клиента несет HTTP статус
+        code = str(getattr(e, 'status', None) or "error")
+        raise
+    finally:
+        API_CALLS.labels(verb, resource, code).inc()
+        API_CALL_DURATION.labels(verb, resource).observe(time.perf_counter() - start)
+
+
+class ReconcileTimer:
+    """Контекст reconcile: in-flight и гистограмма по outcome.
+
+    outcome по умолчанию success, error при исключении; reconcile может
+    заменить его (например, noop при пропуске по spec-hash).
+    """
+
+    def __init__(self):
+        self.outcome = "success"
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        RECONCILES_IN_FLIGHT.inc()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.outcome = "error"
+        RECONCILES_IN_FLIGHT.dec()
+        RECONCILE_DURATION.labels(self.outcome).observe(time.perf_counter() - self._start)
+        global _first_reconcile
+        if not _first_reconcile:
+            # Гонка воркеров здесь безвредна: значения почти совпадают
+            _first_reconcile = True
+            seconds = uptime()
+            TIME_TO_FIRST_RECONCILE.set(seconds)
+            logger.info(f"First reconcile finished {seconds:.3f}s after process start")
+        return False
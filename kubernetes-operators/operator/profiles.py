@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+from decimal import Decimal, InvalidOperation
+import copy
+import re
+
+# Профили производительности: ресурсы контейнера MySQL.
+# custom - только spec.resources; в остальных spec.resources дополняет профиль
+PROFILES = {
+    "small": {
+        "requests": {"memory": "256Mi", "cpu": "100m"},
+        "limits": {"memory": "512Mi", "cpu": "500m"}
+    },
+    "medium": {
+        "requests": {"memory": "2Gi", "cpu": "500m"},
+        "limits": {"memory": "2Gi", "cpu": "2"}
+    },
+    "large": {
+        "requests": {"memory": "8Gi", "cpu": "2"},
+        "limits": {"memory": "8Gi", "cpu": "4"}
+    },
+    "custom": {},
+}
+DEFAULT_PROFILE = "small"
+
+MIB = 1024 ** 2
+GIB = 1024 ** 3
+
+_SUFFIXES = {
+    "": 1, "m": Decimal("0.001"),
+    "k": 10 ** 3, "M": 10 ** 6, "G": 10 ** 9, "T": 10 ** 12, "P": 10 ** 15, "E": 10 ** 18,
+    "Ki": 1024, "Mi": MIB, "Gi": GIB, "Ti": 1024 ** 4, "Pi": 1024 ** 5, "Ei": 1024 ** 6,
+}
+_QUANTITY = re.compile(r"^([0-9.]+)([a-zA-Z]*)$")
+
+
+def quantity_value(quantity):
+    """Точное значение quantity Kubernetes (Decimal): 1.5Gi == 1536Mi, 0.5 == 500m"""
+    match = _QUANTITY.match(str(quantity).strip())
+    if match is None or match.group(2) not in _SUFFIXES:
+        raise ValueError(f"Invalid quantity: {quantity}")
+    try:
+        return Decimal(match.group(1)) * _SUFFIXES[match.group(2)]
+    except InvalidOperation:
+        raise ValueError(f"Invalid quantity: {quantity}")
+
+
+def parse_quantity(quantity):
+    """Объем памяти или диска Kubernetes (512Mi, 1G, 1073741824) в байтах"""
+    return int(quantity_value(quantity))
+
+
+def resources(spec):
+    """requests/limits контейнера MySQL по spec.profile и spec.resources"""
+    profile = spec.get('profile', DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile!r}, expected one of {', '.join(PROFILES)}")
+
+    result = copy.deepcopy(PROFILES[profile])
+    for section, values in (spec.get('resources') or {}).items():
+        result.setdefault(section, {}).update(values)
+    if not result.get('limits', {}).get('memory') and not result.get('requests', {}).get('memory'):
+        raise ValueError(f"Profile {profile!r} requires spec.resources with memory")
+    return result
+
+
+def _round_down(value, step):
+    return value // step * step
+
+
+def mysql_config(memory, overrides=None):
+    """Параметры my.cnf, производные от памяти контейнера (байты).
+
+    innodb_buffer_pool_size - половина памяти до 2Gi и 70% выше, кратно
+    128Mi (innodb_buffer_pool_chunk_size) на экземпляр; остальное - на
+    соединения и служебные буферы. Redo log - четверть buffer pool, 48Mi..2Gi.
+    overrides (spec.mysqlConfig) заменяют вычисленные значения.
+    """
+    share = 0.5 if memory <= 2 * GIB else 0.7
+    instances = max(1, min(8, int(memory * share) // GIB))
+    # Размер, не кратный chunk * instances, MySQL округляет вверх
+    buffer_pool = max(128 * MIB, _round_down(int(memory * share), 128 * MIB * instances))
+    log_file = min(2 * GIB, max(48 * MIB, _round_down(buffer_pool // 4, MIB)))
+
+    config = {
+        "innodb_buffer_pool_size": f"{buffer_pool // MIB}M",
+        "innodb_buffer_pool_instances": instances,
+        "innodb_log_file_size": f"{log_file // MIB}M",
+        "innodb_log_buffer_size": "16M" if memory < 4 * GIB else "64M",
+        # Около 8Mi на соединение в худшем случае (sort/join/read буферы)
+        "max_connections": max(151, min(4000, memory // (8 * MIB))),
+    }
+    config.update(overrides or {})
+    return config
+
+
+def render_my_cnf(config):
+    """Текст my.cnf: одна секция [mysqld], ключи по алфавиту"""
+    lines = ["[mysqld]"] + [f"{key} = {value}" for key, value in sorted(config.items())]
+    return "\n".join(lines) + "\n"
+
+
+def container_memory(resources):
+    """Память, на которую рассчитывается MySQL: limit, иначе request"""
+    memory = resources.get('limits', {}).get('memory') or resources['requests']['memory']
+    return parse_quantity(memory)
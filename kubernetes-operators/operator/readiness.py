@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def workload_ready(workload):
+    """Все pod Deployment или StatefulSet готовы (readinessProbe: MySQL принимает соединения)"""
+    if workload is None:
+        return False
+    status = workload.get('status') or {}
+    desired = workload.get('spec', {}).get('replicas', 1)
+    return (
+        status.get('observedGeneration', 0) >= workload['metadata'].get('generation', 0)
+        and status.get('readyReplicas', 0) >= desired
+    )
+
+
+class TimerWheel:
+    """Хэшированное колесо таймеров: один поток на все таймауты.
+
+    slots ячеек по tick секунд; таймер дальше одного оборота хранит число
+    оставшихся оборотов. Постановка и отмена - O(1), память - O(таймеров).
+    """
+
+    def __init__(self, on_expire, tick=1.0, slots=512):
+        self.on_expire = on_expire
+        self.tick = tick
+        self._slots = [{} for _ in range(slots)]
+        self._where = {}
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._where)
+
+    def schedule(self, key, delay):
+        """Таймер на delay секунд; повторная постановка ключа заменяет таймер"""
+        ticks = max(1, math.ceil(delay / self.tick))
+        with self._lock:
+            self._cancel_locked(key)
+            slot = (self._cursor + ticks) % len(self._slots)
+            self._slots[slot][key] = (ticks - 1) // len(self._slots)
+            self._where[key] = slot
+
+    def _cancel_locked(self, key):
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def cancel(self, key):
+        with self._lock:
+            self._cancel_locked(key)
+
+    def advance(self):
+        """Сдвиг на одну ячейку и вызов on_expire для истекших таймеров"""
+        with self._lock:
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            slot = self._slots[self._cursor]
+            expired = [key for key, rounds in slot.items() if rounds == 0]
+            for key in expired:
+                del slot[key]
+                del self._where[key]
+            for key in slot:
+                slot[key] -= 1
+
+        for key in expired:
+            try:
+                self.on_expire(key)
+            except Exception as e:
+                logger.error(f"Error in timer callback for {key}: {e}")
+
+    def run(self):
+        next_tick = time.monotonic() + self.tick
+        while not self._stop.wait(max(0, next_tick - time.monotonic())):
+            self.advance()
+            next_tick += self.tick
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="timer-wheel", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+class ReadinessTracker:
+    """Ожидание готовности MySQL по событиям watch Deployment/StatefulSet, без опроса.
+
+    track(key, generation) начинает ожидание CR с таймаутом timeout; новая
+    generation CR (например, исправленный image) снова запускает таймер.
+    Переход workload в готовое (или обратно) состояние и истечение таймаута
+    вызывают on_change(key): reconcile CR пересчитывает status.
+    """
+
+    def __init__(self, on_change, timeout=600, tick=1.0, slots=512):
+        self.on_change = on_change
+        self.timeout = timeout
+        self.wheel = TimerWheel(self._expired, tick=tick, slots=slots)
+
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._timed_out = set()
+        self._generations = {}
+
+    def track(self, key, generation=None):
+        """Ожидание готовности CR (повторный вызов с той же generation не сбрасывает таймаут)"""
+        with self._lock:
+            tracked = key in self._pending or key in self._timed_out
+            if tracked and self._generations.get(key) == generation:
+                return
+            self._timed_out.discard(key)
+            self._pending.add(key)
+            self._generations[key] = generation
+        self.wheel.schedule(key, self.timeout)
+
+    def ready(self, key):
+        """CR готов: ожидание и признак таймаута сбрасываются"""
+        with self._lock:
+            self._pending.discard(key)
+            self._timed_out.discard(key)
+            self._generations.pop(key, None)
+        self.wheel.cancel(key)
+
+    def forget(self, key):
+        """CR удален"""
+        self.ready(key)
+
+    def timed_out(self, key):
+        with self._lock:
+            return key in self._timed_out
+
+    def snapshot(self):
+        """Ожидающие готовности и просроченные CR (для отладки)"""
+        with self._lock:
+            return {"pending": sorted(self._pending), "timed_out": sorted(self._timed_out)}
+
+    def _expired(self, key):
+        with self._lock:
+            if key not in self._pending:
+                return
+            self._pending.discard(key)
+            self._timed_out.add(key)
+        logger.warning(f"MySQL {key} is not ready after {self.timeout:g}s")
+        self.on_change(key)
+
+    def on_workload(self, event_type, obj, old):
+        """Событие informer'а Deployment/StatefulSet: реакция только на смену готовности"""
+        instance = (obj['metadata'].get('labels') or {}).get('instance')
+        if instance is None:
+            return
+        # Удаление в очередь ставит обработчик дочерних объектов (с проверкой CR в API)
+        if event_type == 'DELETED':
+            return
+        key = f"{obj['metadata'].get('namespace')}/{instance}"
+
+        ready = workload_ready(obj)
+        if ready == workload_ready(old):
+            return
+        if ready:
+            logger.info(f"MySQL {key} is ready")
+            self.ready(key)
+        self.on_change(key)
+
+    def start(self):
+        return self.wheel.start()
+
+    def stop(self):
+        self.wheel.stop()
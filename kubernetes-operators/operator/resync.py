@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _offset(key, period):
+    """Стабильное смещение ключа внутри периода: ключи равномерно по всему периоду"""
+    value = int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+    return period * value / 2 ** 64
+
+
+class Resyncer:
+    """Периодический resync: каждый известный CR раз в period попадает в очередь.
+
+    В начале каждого периода все ключи из keys_func() ставятся в очередь
+    через add_after() со своим смещением, поэтому нагрузка распределена по
+    периоду, а не приходит одним всплеском. Для каждого ключа интервал между
+    resync равен period. Reconcile без изменений обходится кэшем и не делает
+    запросов к API.
+    """
+
+    def __init__(self, queue, keys_func, period=600):
+        self.queue = queue
+        self.keys_func = keys_func
+        self.period = period
+        self._stop = threading.Event()
+
+    def schedule(self):
+        """Постановка всех ключей на текущий период"""
+        keys = self.keys_func()
+        for key in keys:
+            self.queue.add_after(key, _offset(key, self.period))
+        logger.debug(f"Resync of {len(keys)} keys scheduled over {self.period}s")
+
+    def run(self):
+        # При старте все ключи и так приходят событиями ADDED от list
+        next_period = time.monotonic() + self.period
+        while not self._stop.wait(max(0, next_period - time.monotonic())):
+            try:
+                self.schedule()
+            except Exception as e:
+                logger.error(f"Error scheduling resync: {e}")
+            next_period += self.period
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="resync", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+import argparse
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+RUNTIME_THREADED = "threaded"
+RUNTIME_ASYNC = "async"
+
+# Воркеров по умолчанию: потоков у threaded, одновременных reconcile у async
+DEFAULT_WORKERS = {RUNTIME_THREADED: 4, RUNTIME_ASYNC: 16}
+
+# Настройки threaded runtime, которых нет у async: значение не по умолчанию
+# не меняет поведение, поэтому о нем предупреждение в логе
+ASYNC_IGNORED = ("--resync-period", "--reconcile-qps", "--reconcile-burst", "--bulk-in-flight", "--ready-timeout")
+
+
+def _flag(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _namespaces(value):
+    """Список namespace через запятую; пусто - весь кластер (None)"""
+    namespaces = [namespace.strip() for namespace in value.split(',') if namespace.strip()]
+    return namespaces or None
+
+
+def _optional(value):
+    return value or None
+
+
+# (флаг, переменная окружения, значение по умолчанию, тип, описание).
+# Аргумент командной строки важнее переменной окружения
+OPTIONS = [
+    ("--runtime", "RUNTIME", RUNTIME_THREADED, str,
+     f"{RUNTIME_THREADED} - informer'ы и пул потоков, {RUNTIME_ASYNC} - kubernetes_asyncio"),
+    ("--namespaces", "WATCH_NAMESPACES", "", _namespaces,
+     "namespace через запятую; пусто - весь кластер"),
+    ("--workers", "WORKERS", None, int,
+     "потоков reconcile (threaded) или одновременных reconcile (async)"),
+    ("--resync-period", "RESYNC_PERIOD", "600", float,
+     "секунды между resync каждого CR; 0 - только по событиям"),
+    ("--reconcile-qps", "RECONCILE_QPS", "10", float,
+     "повторов reconcile после ошибок в секунду на все CR (новые события не ограничиваются); 0 - без ограничения"),
+    ("--reconcile-burst", "RECONCILE_BURST", "100", int, "повторов подряд сверх reconcile-qps"),
+    ("--api-qps", "API_QPS", "0", float,
+     "запросов к API серверу в секунду на процесс (как QPS в client-go); 0 - без ограничения"),
+    ("--api-burst", "API_BURST", "100", int, "запросов к API серверу подряд сверх api-qps"),
+    ("--connection-pool-size", "CONNECTION_POOL_SIZE", "32", int,
+     "соединений с API сервером (async; у threaded - по числу воркеров)"),
+    ("--metrics-port", "METRICS_PORT", "8000", int, "порт /metrics; 0 - выключен"),
+    ("--leader-elect", "LEADER_ELECT", "false", _flag, "один активный лидер (Lease)"),
+    ("--shard-by", "SHARD_BY", "", _optional, "шардирование CR между репликами: namespace или key"),
+    ("--identity", "POD_NAME", "", _optional, "имя реплики для Lease; по умолчанию hostname"),
+    ("--lease-namespace", "POD_NAMESPACE", "default", str, "namespace объектов Lease"),
+    ("--bulk-in-flight", "BULK_IN_FLIGHT", "32", int,
+     "параллельных запросов при массовом создании CR; 0 - без bulk"),
+    ("--ready-timeout", "READY_TIMEOUT", "600", float,
+     "секунды ожидания готовности MySQL до Ready=False/ReadinessTimeout"),
+    ("--manifest-overlays", "MANIFEST_OVERLAYS", "", _optional,
+     "файл или каталог YAML overlay дочерних манифестов"),
+    ("--hostpath-pv", "HOSTPATH_PV", "false", _flag,
+     "hostPath PV для CR без storageClassName (minikube, kind)"),
+    ("--debug-port", "DEBUG_PORT", "0", int, "отладочный endpoint /debug/*; 0 - выключен"),
+    ("--debug-address", "DEBUG_ADDRESS", "127.0.0.1", str, "адрес отладочного endpoint"),
+]
+
+
+def parse_args(argv=None, environ=None):
+    """Настройки оператора из аргументов командной строки и окружения.
+
+    У каждого аргумента есть переменная окружения (см. --help), поэтому
+    в Deployment оператор настраивается через env без изменения command.
+    Логирование настраивается только через окружение: LOG_LEVEL,
+    LOG_FORMAT, LOG_RATE и LOG_BURST.
+    """
+    environ = os.environ if environ is None else environ
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="MySQL operator",
+        epilog="Логирование: LOG_LEVEL, LOG_FORMAT (text/json), LOG_RATE, LOG_BURST"
+    )
+    for flag, env, default, type_, help_ in OPTIONS:
+        value = environ.get(env, default)
+        parser.add_argument(
+            flag,
+            type=type_,
+            default=None if value is None else type_(value),
+            metavar=env,
+            help=f"{help_} (env {env})"
+        )
+
+    args = parser.parse_args(argv)
+    if args.runtime not in DEFAULT_WORKERS:
+        parser.error(f"--runtime must be {RUNTIME_THREADED} or {RUNTIME_ASYNC}")
+    if args.workers is None:
+        args.workers = DEFAULT_WORKERS[args.runtime]
+    if args.shard_by not in (None, "namespace", "key"):
+        parser.error("--shard-by must be namespace or key")
+    if args.leader_elect and args.shard_by:
+        # Шардирование само делит CR между всеми репликами, лидер не выбирается
+        parser.error("--leader-elect and --shard-by are mutually exclusive")
+    for flag, value in (("--reconcile-qps", args.reconcile_qps), ("--api-qps", args.api_qps)):
+        if value < 0:
+            parser.error(f"{flag} must be >= 0 (0 - unlimited)")
+    for flag, value in (("--reconcile-burst", args.reconcile_burst), ("--api-burst", args.api_burst)):
+        if value < 1:
+            parser.error(f"{flag} must be >= 1")
+    if args.runtime == RUNTIME_ASYNC:
+        # async runtime - один watch MySQL CR на весь кластер без HA
+        unsupported = [
+            flag for flag, enabled in (
+                ("--namespaces", args.namespaces),
+                ("--leader-elect", args.leader_elect),
+                ("--shard-by", args.shard_by),
+                ("--hostpath-pv", args.hostpath_pv),
+            ) if enabled
+        ]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} not supported by the {RUNTIME_ASYNC} runtime")
+        ignored = [
+            flag for flag, env, default, type_, help_ in OPTIONS
+            if flag in ASYNC_IGNORED and getattr(args, _dest(flag)) != type_(default)
+        ]
+        if ignored:
+            logger.warning(f"{', '.join(ignored)} ignored by the {RUNTIME_ASYNC} runtime")
+    return args
+
+
+def _dest(flag):
+    return flag[2:].replace('-', '_')
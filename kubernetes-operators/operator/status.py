@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+from datetime import datetime, timezone
+import copy
+import json
+import logging
+
+import metrics
+from manifests import TOPOLOGY_REPLICATED, resource_name, service_name, topology
+
+logger = logging.getLogger(__name__)
+
+PHASE_PROVISIONING = "Provisioning"
+PHASE_READY = "Ready"
+PHASE_FAILED = "Failed"
+
+# Предел длины condition.message
+MESSAGE_LIMIT = 256
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def endpoint(name, namespace):
+    """Адрес MySQL внутри кластера (Service из manifests.render_service)"""
+    return f"{resource_name('Service', name)}.{namespace}.svc:3306"
+
+
+def endpoints(name, namespace, spec):
+    """Поля status с адресами: endpoint - запись, readEndpoint - чтение с реплик"""
+    if topology(spec) != TOPOLOGY_REPLICATED:
+        return {"endpoint": endpoint(name, namespace)}
+    return {
+        "endpoint": f"{service_name(name, 'primary')}.{namespace}.svc:3306",
+        "readEndpoint": f"{service_name(name, 'read')}.{namespace}.svc:3306",
+    }
+
+
+def error_message(e, limit=MESSAGE_LIMIT):
+    """Короткий текст ошибки для condition.message.
+
+    str(ApiException) включает заголовки ответа (Date меняется при каждой
+    попытке - каждый повтор давал бы новый patch status) и все тело; вместо
+    него берется message из тела Status или reason ответа.
+    """
+    message = None
+    body = getattr(e, 'body', None)
+    if body:
+        try:
+            message = json.loads(body).get('message')
+        except (ValueError, TypeError, AttributeError):
+            pass
+    message = str(message or getattr(e, 'reason', None) or e).strip()
+    message = message.splitlines()[0] if message else type(e).__name__
+    return message if len(message) <= limit else message[:limit - 3] + "..."
+
+
+def needs_reconcile(event_type, obj):
+    """Нужен ли reconcile по событию CR.
+
+    MODIFIED без изменения spec (generation == status.observedGeneration) -
+    это запись status или metadata, в том числе нашим же StatusWriter.
+    Начало удаления CR (deletionTimestamp) нужно для снятия финализатора.
+    """
+    if event_type != "MODIFIED" or obj.get('metadata', {}).get('deletionTimestamp'):
+        return True
+    generation = obj.get('metadata', {}).get('generation')
+    observed = (obj.get('status') or {}).get('observedGeneration')
+    return generation is None or generation != observed
+
+
+class StatusWriter:
+    """Изменения status одного CR, записываемые одним merge patch.
+
+    set() и set_condition() меняют только копию в памяти; patch() возвращает
+    разницу с исходным status, flush() отправляет ее, если она не пуста.
+    """
+
+    def __init__(self, obj):
+        self.name = obj['metadata']['name']
+        self.namespace = obj['metadata'].get('namespace')
+        self.generation = obj['metadata'].get('generation')
+        self.current = copy.deepcopy(obj.get('status') or {})
+        self.desired = copy.deepcopy(self.current)
+
+    def set(self, **fields):
+        self.desired.update(fields)
+
+    def set_condition(self, type_, status, reason, message=""):
+        """Условие в стиле metav1.Condition; время меняется только при смене status"""
+        conditions = self.desired.setdefault('conditions', [])
+        condition = next((c for c in conditions if c.get('type') == type_), None)
+        if condition is None:
+            condition = {"type": type_}
+            conditions.append(condition)
+        if condition.get('status') != status:
+            condition['lastTransitionTime'] = _now()
+        condition.update({
+            "status": status,
+            "reason": reason,
+            "message": message,
+            "observedGeneration": self.generation
+        })
+
+    def patch(self):
+        """Merge patch от исходного status к желаемому (списки целиком)"""
+        changed = {
+            key: value
+            for key, value in self.desired.items()
+            if self.current.get(key) != value
+        }
+        for key in self.current:
+            if key not in self.desired:
+                changed[key] = None
+        return changed
+
+    def flush(self, custom_api, group, version, plural):
+        """Запись накопленных изменений; False, если status не изменился"""
+        changed = self.patch()
+        if not changed:
+            return False
+
+        with metrics.api_call("patch", f"{plural}/status"):
+            custom_api.patch_namespaced_custom_object_status(
+                group=group,
+                version=version,
+                namespace=self.namespace,
+                plural=plural,
+                name=self.name,
+                body={"status": changed}
+            )
+        self.current = copy.deepcopy(self.desired)
+        logger.debug(f"Status of MySQL CR {self.name} updated: {changed}")
+        return True
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+from profiles import parse_quantity
+
+
+def _requested(pvc):
+    return pvc['spec']['resources']['requests']['storage']
+
+
+def is_static(manifest):
+    """PVC привязан к заранее созданному PV (volumeName, например hostPath): расширить его нельзя"""
+    return bool(manifest['spec'].get('volumeName'))
+
+
+def change_error(manifest, live, rejected=None):
+    """Почему существующий PVC нельзя привести к manifest: (reason, message) или None.
+
+    storageClassName PVC неизменяем, а уменьшить запрошенный объем API
+    сервер не позволяет - такой apply только копил бы ошибки и повторы.
+    Расширение невозможно для статически привязанного PVC и для PVC, чей
+    StorageClass его не разрешает: rejected - (объем, сообщение) отказа API
+    сервера на прошлый apply, до изменения storageSize он не повторяется.
+    """
+    if live is None:
+        return None
+    desired_class = manifest['spec'].get('storageClassName')
+    live_class = live.get('spec', {}).get('storageClassName')
+    if desired_class is not None and desired_class != live_class:
+        return (
+            "StorageClassImmutable",
+            f"PVC uses storageClassName {live_class}, it cannot be changed to {desired_class}"
+        )
+    if parse_quantity(_requested(manifest)) < parse_quantity(_requested(live)):
+        return (
+            "ShrinkNotSupported",
+            f"PVC cannot shrink from {_requested(live)} to {_requested(manifest)}"
+        )
+    if parse_quantity(_requested(manifest)) > parse_quantity(_requested(live)):
+        if is_static(manifest):
+            return (
+                "ExpansionNotSupported",
+                f"PVC is bound to PersistentVolume {manifest['spec']['volumeName']}, "
+                f"it cannot grow from {_requested(live)} to {_requested(manifest)}"
+            )
+        if rejected is not None and rejected[0] == _requested(manifest):
+            return "ExpansionNotSupported", rejected[1]
+    return None
+
+
+def resize_condition(manifest, live, rejected=None):
+    """Условие StorageResized: (status, reason, message) по PVC из кэша"""
+    error = change_error(manifest, live, rejected)
+    if error is not None:
+        return ("False",) + error
+    if live is None:
+        return "False", "Pending", "PVC is not created yet"
+
+    requested = _requested(manifest)
+    pvc_status = live.get('status') or {}
+    capacity = (pvc_status.get('capacity') or {}).get('storage')
+    if capacity is None:
+        return "False", "Pending", "PVC is not bound yet"
+    if parse_quantity(capacity) >= parse_quantity(requested):
+        return "True", "CapacityMatches", ""
+
+    # Условия, которые выставляют resizer и kubelet при расширении тома
+    conditions = {c.get('type'): c for c in pvc_status.get('conditions') or []}
+    for type_ in ("FileSystemResizePending", "Resizing"):
+        condition = conditions.get(type_)
+        if condition is not None and condition.get('status') == "True":
+            return "False", type_, condition.get('message') or f"Expanding {capacity} to {requested}"
+    return "False", "ResizeRequested", f"Expanding {capacity} to {requested}"
+
+
+def storage_status(manifest, live):
+    """Поле status.storage: запрошенный и фактический объем"""
+    status = {"requested": _requested(manifest)}
+    capacity = ((live or {}).get('status') or {}).get('capacity', {}).get('storage')
+    if capacity is not None:
+        status["capacity"] = capacity
+    return status
@@ -0,0 +1,112 @@
+import copy
+
+from leader import ShardRing
+
+KEYS = [f"ns-{i % 7}/db-{i}" for i in range(500)]
+
+
+class FakeLeases:
+    """LeaseClient в памяти: Lease общие для всех ShardRing теста"""
+
+    namespace = "default"
+
+    def __init__(self):
+        self.items = {}
+        self.version = 0
+
+    def _stamp(self, lease):
+        self.version += 1
+        lease['metadata']['resourceVersion'] = str(self.version)
+        self.items[lease['metadata']['name']] = lease
+
+    def get(self, name):
+        return copy.deepcopy(self.items.get(name))
+
+    def list(self, label_selector):
+        return copy.deepcopy(list(self.items.values()))
+
+    def create(self, lease):
+        self._stamp(copy.deepcopy(lease))
+
+    def replace(self, lease):
+        self._stamp(copy.deepcopy(lease))
+
+    def delete(self, name, resource_version=None):
+        self.items.pop(name, None)
+
+
+def make_rings(identities, shard_by="key"):
+    leases = FakeLeases()
+    rings = {}
+    for identity in identities:
+        ring = ShardRing(None, "default", identity, shard_by=shard_by)
+        ring.leases = leases
+        rings[identity] = ring
+    for ring in rings.values():
+        ring.sync()
+    for ring in rings.values():
+        ring.sync()
+    return leases, rings
+
+
+def owners(rings):
+    return {key: [identity for identity, ring in rings.items() if ring.owns(key)] for key in KEYS}
+
+
+def test_every_key_has_exactly_one_owner():
+    _, rings = make_rings(["a", "b", "c"])
+    assert all(ring.members == ("a", "b", "c") for ring in rings.values())
+    result = owners(rings)
+    assert all(len(owner) == 1 for owner in result.values())
+    # Ключи распределены между всеми репликами
+    assert {owner[0] for owner in result.values()} == {"a", "b", "c"}
+
+
+def test_member_leaving_moves_only_its_keys():
+    leases, rings = make_rings(["a", "b", "c"])
+    before = {key: owner[0] for key, owner in owners(rings).items()}
+
+    rings.pop("c").stop()
+    assert "mysql-operator-shard-c" not in leases.items
+    changed = []
+    for ring in rings.values():
+        ring.on_change = lambda: changed.append(True)
+        ring.sync()
+    assert len(changed) == 2
+
+    after = {key: owner[0] for key, owner in owners(rings).items()}
+    for key, owner in before.items():
+        if owner != "c":
+            assert after[key] == owner
+    assert set(after.values()) == {"a", "b"}
+
+
+def test_member_joining_takes_keys_only_from_others():
+    _, rings = make_rings(["a", "b"])
+    before = {key: owner[0] for key, owner in owners(rings).items()}
+
+    leases = rings["a"].leases
+    joined = ShardRing(None, "default", "c", shard_by="key")
+    joined.leases = leases
+    joined.sync()
+    for ring in rings.values():
+        ring.sync()
+    rings["c"] = joined
+
+    after = owners(rings)
+    assert all(len(owner) == 1 for owner in after.values())
+    moved = [key for key in KEYS if after[key][0] != before[key]]
+    assert moved and all(after[key] == ["c"] for key in moved)
+
+
+def test_shard_by_namespace_keeps_namespace_together():
+    _, rings = make_rings(["a", "b", "c"], shard_by="namespace")
+    by_namespace = {}
+    for key, owner in owners(rings).items():
+        by_namespace.setdefault(key.split('/')[0], set()).update(owner)
+    assert all(len(owner) == 1 for owner in by_namespace.values())
+
+
+def test_ring_without_sync_owns_nothing():
+    ring = ShardRing(None, "default", "a")
+    assert not ring.owns("ns/db")
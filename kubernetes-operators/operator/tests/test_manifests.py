@@ -0,0 +1,47 @@
+import copy
+
+from manifests import has_drifted, is_subset, render_pvc, same_quantity
+
+
+def test_same_quantity_compares_values():
+    assert same_quantity("1.5Gi", "1536Mi")
+    assert same_quantity("1024Mi", "1Gi")
+    assert same_quantity("0.5", "500m")
+    assert not same_quantity("1Gi", "1G")
+    assert not same_quantity("1Gi", "bogus")
+
+
+def test_is_subset_ignores_server_fields():
+    assert is_subset({"a": 1}, {"a": 1, "b": 2})
+    assert not is_subset({"a": 1, "b": 2}, {"a": 1})
+    assert not is_subset({"a": [1, 2]}, {"a": [1]})
+
+
+def test_is_subset_compares_quantities_only_in_quantity_fields():
+    desired = {"resources": {"limits": {"memory": "1024Mi", "cpu": "0.5"}}}
+    live = {"resources": {"limits": {"memory": "1Gi", "cpu": "500m"}}}
+    assert is_subset(desired, live)
+    assert is_subset({"capacity": {"storage": "2048Mi"}}, {"capacity": {"storage": "2Gi"}})
+    assert not is_subset({"resources": {"limits": {"memory": "2Gi"}}}, live)
+    # Вне QUANTITY_FIELDS строки сравниваются как есть
+    assert not is_subset({"args": ["1024Mi"]}, {"args": ["1Gi"]})
+
+
+def test_canonical_pvc_size_is_not_drift():
+    manifest = render_pvc("db", "ns", "1.5Gi")
+    live = copy.deepcopy(manifest)
+    live["metadata"]["uid"] = "uid-1"
+    live["spec"]["resources"]["requests"]["storage"] = "1536Mi"
+    live["spec"]["volumeMode"] = "Filesystem"
+    live["status"] = {"phase": "Bound"}
+    assert not has_drifted(manifest, live)
+
+    live["spec"]["resources"]["requests"]["storage"] = "1Gi"
+    assert has_drifted(manifest, live)
+
+
+def test_changed_labels_are_drift():
+    manifest = render_pvc("db", "ns", "1Gi")
+    live = copy.deepcopy(manifest)
+    live["metadata"]["labels"]["instance"] = "other"
+    assert has_drifted(manifest, live)
@@ -0,0 +1,68 @@
+import pytest
+
+from profiles import GIB, MIB, container_memory, mysql_config, parse_quantity, quantity_value, resources
+
+
+def test_parse_quantity():
+    assert parse_quantity("512Mi") == 512 * MIB
+    assert parse_quantity("1G") == 10 ** 9
+    assert parse_quantity("1073741824") == GIB
+    assert parse_quantity("1.5Gi") == 1536 * MIB
+    assert str(quantity_value("250m")) == "0.250"
+    for invalid in ("", "1Gb", "abc", "1..5Gi"):
+        with pytest.raises(ValueError):
+            parse_quantity(invalid)
+
+
+def test_small_memory_uses_minimums():
+    config = mysql_config(512 * MIB)
+    assert config == {
+        "innodb_buffer_pool_size": "256M",
+        "innodb_buffer_pool_instances": 1,
+        "innodb_log_file_size": "64M",
+        "innodb_log_buffer_size": "16M",
+        "max_connections": 151,
+    }
+
+
+def test_buffer_pool_is_half_up_to_2gi():
+    config = mysql_config(2 * GIB)
+    assert config["innodb_buffer_pool_size"] == "1024M"
+    assert config["innodb_log_file_size"] == "256M"
+    assert config["max_connections"] == 256
+
+
+def test_large_memory_splits_buffer_pool_into_instances():
+    config = mysql_config(8 * GIB)
+    # 70% от 8Gi, кратно 128Mi * 5 экземпляров
+    assert config["innodb_buffer_pool_instances"] == 5
+    assert config["innodb_buffer_pool_size"] == "5120M"
+    assert (5120 * MIB) % (128 * MIB * 5) == 0
+    assert config["innodb_log_file_size"] == "1280M"
+    assert config["innodb_log_buffer_size"] == "64M"
+    assert config["max_connections"] == 1024
+
+
+def test_log_file_and_connections_are_capped():
+    config = mysql_config(64 * GIB)
+    assert config["innodb_buffer_pool_instances"] == 8
+    assert config["innodb_log_file_size"] == "2048M"
+    assert config["max_connections"] == 4000
+
+
+def test_overrides_replace_computed_values():
+    config = mysql_config(GIB, {"max_connections": 50, "sql_mode": "STRICT_ALL_TABLES"})
+    assert config["max_connections"] == 50
+    assert config["sql_mode"] == "STRICT_ALL_TABLES"
+    assert config["innodb_buffer_pool_size"] == "512M"
+
+
+def test_resources_merge_profile_and_spec():
+    result = resources({"profile": "medium", "resources": {"limits": {"cpu": "3"}}})
+    assert result["limits"] == {"memory": "2Gi", "cpu": "3"}
+    assert container_memory(result) == 2 * GIB
+    assert container_memory(resources({})) == 512 * MIB
+    with pytest.raises(ValueError):
+        resources({"profile": "huge"})
+    with pytest.raises(ValueError):
+        resources({"profile": "custom"})
@@ -0,0 +1,73 @@
+from readiness import ReadinessTracker, TimerWheel, workload_ready
+
+
+def test_timer_expires_after_several_rounds():
+    expired = []
+    wheel = TimerWheel(expired.append, tick=1, slots=4)
+    wheel.schedule("ns/a", 10)
+    wheel.schedule("ns/b", 3)
+
+    for _ in range(3):
+        wheel.advance()
+    assert expired == ["ns/b"]
+
+    # 10 тиков при 4 ячейках - два полных оборота и еще два тика
+    for _ in range(6):
+        wheel.advance()
+    assert expired == ["ns/b"]
+    wheel.advance()
+    assert expired == ["ns/b", "ns/a"]
+    assert len(wheel) == 0
+
+
+def test_reschedule_replaces_and_cancel_removes_timer():
+    expired = []
+    wheel = TimerWheel(expired.append, tick=1, slots=8)
+    wheel.schedule("ns/a", 2)
+    wheel.schedule("ns/a", 5)
+    wheel.schedule("ns/b", 1)
+    wheel.cancel("ns/b")
+    assert len(wheel) == 1
+
+    for _ in range(4):
+        wheel.advance()
+    assert expired == []
+    wheel.advance()
+    assert expired == ["ns/a"]
+
+
+def test_tracker_rearms_timeout_on_new_generation():
+    changed = []
+    tracker = ReadinessTracker(changed.append, timeout=2, tick=1, slots=8)
+    tracker.track("ns/a", 1)
+    tracker.wheel.advance()
+    tracker.wheel.advance()
+    assert tracker.timed_out("ns/a")
+    assert changed == ["ns/a"]
+
+    # Та же generation: таймаут остается
+    tracker.track("ns/a", 1)
+    assert tracker.timed_out("ns/a")
+
+    tracker.track("ns/a", 2)
+    assert not tracker.timed_out("ns/a")
+    tracker.wheel.advance()
+    assert not tracker.timed_out("ns/a")
+    tracker.wheel.advance()
+    assert tracker.timed_out("ns/a")
+
+    tracker.ready("ns/a")
+    assert not tracker.timed_out("ns/a")
+    assert len(tracker.wheel) == 0
+
+
+def test_workload_ready_requires_observed_generation():
+    workload = {
+        "metadata": {"generation": 2},
+        "spec": {"replicas": 1},
+        "status": {"observedGeneration": 1, "readyReplicas": 1},
+    }
+    assert not workload_ready(workload)
+    workload["status"]["observedGeneration"] = 2
+    assert workload_ready(workload)
+    assert not workload_ready(None)
@@ -0,0 +1,60 @@
+import pytest
+
+import settings
+
+
+def parse(*argv, **environ):
+    return settings.parse_args(list(argv), environ)
+
+
+def test_defaults():
+    args = parse()
+    assert args.runtime == settings.RUNTIME_THREADED
+    assert args.workers == settings.DEFAULT_WORKERS[settings.RUNTIME_THREADED]
+    assert args.namespaces is None
+    assert args.shard_by is None
+    assert args.leader_elect is False
+
+
+def test_argument_overrides_environment():
+    args = parse("--workers", "8", WORKERS="2", WATCH_NAMESPACES="a, b,", LEADER_ELECT="true")
+    assert args.workers == 8
+    assert args.namespaces == ["a", "b"]
+    assert args.leader_elect is True
+
+
+def test_async_default_workers():
+    assert parse(RUNTIME="async").workers == settings.DEFAULT_WORKERS[settings.RUNTIME_ASYNC]
+
+
+def test_zero_qps_means_unlimited():
+    args = parse("--reconcile-qps", "0", "--api-qps", "0")
+    assert args.reconcile_qps == 0
+    assert args.api_qps == 0
+
+
+@pytest.mark.parametrize("argv", [
+    ["--runtime", "gevent"],
+    ["--shard-by", "pod"],
+    ["--reconcile-qps", "-1"],
+    ["--api-qps", "-0.5"],
+    ["--reconcile-burst", "0"],
+    ["--api-burst", "0"],
+    ["--leader-elect", "true", "--shard-by", "key"],
+    ["--runtime", "async", "--namespaces", "a"],
+    ["--runtime", "async", "--leader-elect", "true"],
+    ["--runtime", "async", "--shard-by", "namespace"],
+    ["--runtime", "async", "--hostpath-pv", "true"],
+])
+def test_invalid_combinations_are_rejected(argv):
+    with pytest.raises(SystemExit):
+        parse(*argv)
+
+
+def test_async_warns_about_ignored_options(caplog):
+    parse("--runtime", "async", "--resync-period", "60")
+    assert "--resync-period ignored" in caplog.text
+
+    caplog.clear()
+    parse("--runtime", "async")
+    assert "ignored" not in caplog.text
@@ -0,0 +1,73 @@
+import json
+
+from status import StatusWriter, error_message, needs_reconcile
+
+
+def cr(status=None, generation=3):
+    obj = {"metadata": {"name": "db", "namespace": "ns", "generation": generation}}
+    if status is not None:
+        obj["status"] = status
+    return obj
+
+
+def test_patch_is_empty_without_changes():
+    writer = StatusWriter(cr({"phase": "Ready", "observedGeneration": 3}))
+    writer.set(phase="Ready", observedGeneration=3)
+    assert writer.patch() == {}
+
+
+def test_patch_contains_only_changed_fields():
+    writer = StatusWriter(cr({"phase": "Provisioning", "endpoint": "db.ns.svc:3306"}))
+    writer.set(phase="Ready", endpoint="db.ns.svc:3306", observedGeneration=3)
+    assert writer.patch() == {"phase": "Ready", "observedGeneration": 3}
+
+
+def test_patch_removes_dropped_fields():
+    writer = StatusWriter(cr({"phase": "Ready", "readEndpoint": "db-read.ns.svc:3306"}))
+    del writer.desired["readEndpoint"]
+    assert writer.patch() == {"readEndpoint": None}
+
+
+def test_unchanged_condition_keeps_transition_time():
+    condition = {
+        "type": "Ready", "status": "True", "reason": "DeploymentReady", "message": "",
+        "observedGeneration": 3, "lastTransitionTime": "2024-01-01T00:00:00Z",
+    }
+    writer = StatusWriter(cr({"conditions": [condition]}))
+    writer.set_condition("Ready", "True", "DeploymentReady")
+    assert writer.patch() == {}
+
+    writer.set_condition("Ready", "False", "DeploymentNotReady")
+    conditions = writer.patch()["conditions"]
+    assert conditions[0]["status"] == "False"
+    assert conditions[0]["lastTransitionTime"] != "2024-01-01T00:00:00Z"
+
+
+def test_new_condition_is_appended():
+    writer = StatusWriter(cr({"conditions": [{"type": "Synced", "status": "True"}]}))
+    writer.set_condition("StorageResized", "True", "Resized")
+    types = [condition["type"] for condition in writer.patch()["conditions"]]
+    assert types == ["Synced", "StorageResized"]
+
+
+def test_needs_reconcile_skips_status_writes():
+    assert not needs_reconcile("MODIFIED", cr({"observedGeneration": 3}))
+    assert needs_reconcile("MODIFIED", cr({"observedGeneration": 2}))
+    assert needs_reconcile("ADDED", cr({"observedGeneration": 3}))
+    deleting = cr({"observedGeneration": 3})
+    deleting["metadata"]["deletionTimestamp"] = "2024-01-01T00:00:00Z"
+    assert needs_reconcile("MODIFIED", deleting)
+
+
+class FakeApiException(Exception):
+    def __init__(self, body, reason="Unprocessable Entity"):
+        super().__init__(f"(422)\nReason: {reason}\nHTTP response headers: Date: now\n{body}")
+        self.body = body
+        self.reason = reason
+
+
+def test_error_message_uses_status_message():
+    e = FakeApiException(json.dumps({"kind": "Status", "message": "spec.replicas: Invalid value"}))
+    assert error_message(e) == "spec.replicas: Invalid value"
+    assert error_message(FakeApiException("not json")) == "Unprocessable Entity"
+    assert len(error_message(ValueError("x" * 1000), limit=20)) == 20
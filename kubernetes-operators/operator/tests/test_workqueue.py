@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from workqueue import RateLimitingQueue, TokenBucket, WorkerPool
+
+
+def test_add_deduplicates_pending_keys():
+    queue = RateLimitingQueue()
+    for _ in range(3):
+        queue.add("ns/a")
+    queue.add("ns/b")
+    assert len(queue) == 2
+    assert [queue.get(), queue.get()] == ["ns/a", "ns/b"]
+
+
+def test_key_in_processing_is_not_handed_out_again():
+    queue = RateLimitingQueue()
+    queue.add("ns/a")
+    assert queue.get() == "ns/a"
+
+    # Изменение во время обработки: ключ ждет done(), а не второго воркера
+    queue.add("ns/a")
+    queue.add("ns/a")
+    assert len(queue) == 0
+
+    queue.done("ns/a")
+    assert len(queue) == 1
+    assert queue.get() == "ns/a"
+    queue.done("ns/a")
+    assert len(queue) == 0
+
+
+def test_add_after_promotes_key_when_due():
+    queue = RateLimitingQueue()
+    started = time.monotonic()
+    queue.add_after("ns/a", 0.05)
+    assert len(queue) == 0
+    assert queue.get() == "ns/a"
+    assert time.monotonic() - started >= 0.05
+
+
+def test_add_after_keeps_earliest_deadline():
+    queue = RateLimitingQueue()
+    queue.add_after("ns/a", 60)
+    queue.add_after("ns/a", 0.01)
+    queue.add_after("ns/a", 30)
+    started = time.monotonic()
+    assert queue.get() == "ns/a"
+    assert time.monotonic() - started < 5
+    assert queue.snapshot()["waiting"] == 0
+
+
+def test_add_after_for_queued_key_is_deduplicated():
+    queue = RateLimitingQueue()
+    queue.add("ns/a")
+    queue.add_after("ns/a", 0.01)
+    time.sleep(0.02)
+    assert queue.get() == "ns/a"
+    queue.done("ns/a")
+    assert len(queue) == 0
+
+
+def test_backoff_doubles_per_key_and_forget_resets():
+    queue = RateLimitingQueue(base_delay=0.01, max_delay=0.05, qps=0)
+    assert [queue.when("ns/a") for _ in range(5)] == [0.01, 0.02, 0.04, 0.05, 0.05]
+    assert queue.when("ns/b") == 0.01
+    queue.forget("ns/a")
+    assert queue.num_requeues("ns/a") == 0
+    assert queue.when("ns/a") == 0.01
+
+
+def test_token_bucket_limits_after_burst():
+    bucket = TokenBucket(qps=10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+
+
+def test_workers_never_process_one_key_concurrently():
+    queue = RateLimitingQueue()
+    lock = threading.Lock()
+    active = set()
+    overlaps = []
+    processed = []
+
+    def handler(key):
+        with lock:
+            if key in active:
+                overlaps.append(key)
+            active.add(key)
+        time.sleep(0.001)
+        with lock:
+            active.discard(key)
+            processed.append(key)
+
+    pool = WorkerPool(queue, handler, workers=8)
+    pool.start()
+    for _ in range(50):
+        for i in range(4):
+            queue.add(f"ns/{i}")
+        time.sleep(0.0005)
+
+    deadline = time.monotonic() + 5
+    while (len(queue) or queue.snapshot()["processing"]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pool.stop()
+
+    assert overlaps == []
+    assert set(processed) == {f"ns/{i}" for i in range(4)}
+    # Дубликаты схлопываются: обработок меньше, чем добавлений
+    assert len(processed) < 200
+
+
+def test_failed_key_is_retried_with_backoff():
+    queue = RateLimitingQueue(base_delay=0.01, qps=0)
+    calls = []
+    done = threading.Event()
+
+    def handler(key):
+        calls.append(key)
+        if len(calls) < 3:
+            raise RuntimeError("apply failed")
+        done.set()
+
+    pool = WorkerPool(queue, handler, workers=2)
+    pool.start()
+    queue.add("ns/a")
+    assert done.wait(5)
+    pool.stop()
+
+    assert calls == ["ns/a"] * 3
+    assert queue.num_requeues("ns/a") == 0
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import heapq
+import itertools
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Глобальный лимит: qps токенов в секунду, не более burst подряд"""
+
+    def __init__(self, qps, burst):
+        self.qps = float(qps)
+        self.burst = int(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Забирает токен и возвращает, сколько секунд нужно подождать до его появления"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.qps)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.qps
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RateLimitingQueue:
+    """Очередь ключей namespace/name для reconcile.
+
+    Семантика как у workqueue из client-go:
+    - ключ, уже ожидающий обработки, повторно не добавляется (дедупликация);
+    - ключ не выдается двум воркерам одновременно: если он изменился во время
+      обработки, он вернется в очередь только после done();
+    - add_rate_limited() откладывает ключ на max(экспоненциальный backoff
+      ключа, задержка глобального token bucket).
+
+    qps/burst ограничивают только повторы (add_rate_limited), а не add();
+    qps <= 0 - повторы без общего лимита.
+    """
+
+    def __init__(self, base_delay=0.005, max_delay=300, qps=10, burst=100):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(qps, burst) if qps > 0 else None
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._dirty = set()
+        self._processing = set()
+        self._failures = {}
+        # Отложенные ключи: heap (время готовности, ключ) + актуальное время по ключу
+        self._waiting = []
+        self._waiting_keys = {}
+        self._shutting_down = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _add_locked(self, key):
+        if key in self._dirty:
+            return
+        self._dirty.add(key)
+        if key in self._processing:
+            return
+        self._queue.append(key)
+        self._cond.notify()
+
+    def add(self, key):
+        with self._cond:
+            if self._shutting_down:
+                return
+            self._add_locked(key)
+
+    def add_after(self, key, delay):
+        """Добавление ключа через delay секунд"""
+        if delay <= 0:
+            self.add(key)
+            return
+
+        ready_at = time.monotonic() + delay
+        with self._cond:
+            if self._shutting_down:
+                return
+            current = self._waiting_keys.get(key)
+            if current is not None and current <= ready_at:
+                return
+            self._waiting_keys[key] = ready_at
+            heapq.heappush(self._waiting, (ready_at, key))
+            self._cond.notify_all()
+
+    def when(self, key):
+        """Задержка для очередной повторной попытки по ключу"""
+        with self._cond:
+            failures = self._failures.get(key, 0)
+            self._failures[key] = failures + 1
+        backoff = min(self.base_delay * (2 ** failures), self.max_delay)
+        if self.bucket is None:
+            return backoff
+        return max(backoff, self.bucket.reserve())
+
+    def add_rate_limited(self, key):
+        self.add_after(key, self.when(key))
+
+    def forget(self, key):
+        """Сброс счетчика неудач ключа после успешной обработки"""
+        with self._cond:
+            self._failures.pop(key, None)
+
+    def num_requeues(self, key):
+        with self._cond:
+            return self._failures.get(key, 0)
+
+    def _promote_waiting_locked(self):
+        """Перенос в очередь отложенных ключей, время которых наступило.
+
+        Возвращает время до следующего отложенного ключа или None.
+        """
+        now = time.monotonic()
+        while self._waiting:
+            ready_at, key = self._waiting[0]
+            if self._waiting_keys.get(key) != ready_at:
+                heapq.heappop(self._waiting)  # устаревшая запись
+                continue
+            if ready_at > now:
+                return ready_at - now
+            heapq.heappop(self._waiting)
+            del self._waiting_keys[key]
+            self._add_locked(key)
+        return None
+
+    def get(self):
+        """Блокирующее получение ключа; None после shutdown()"""
+        with self._cond:
+            while True:
+                timeout = self._promote_waiting_locked()
+                if self._queue:
+                    key = self._queue.popleft()
+                    self._processing.add(key)
+                    self._dirty.discard(key)
+                    return key
+                if self._shutting_down:
+                    return None
+                self._cond.wait(timeout)
+
+    def done(self, key):
+        """Завершение обработки ключа"""
+        with self._cond:
+            self._processing.discard(key)
+            if key in self._dirty:
+                self._queue.append(key)
+                self._cond.notify()
+
+    def shutdown(self):
+        with self._cond:
+            self._shutting_down = True
+            self._cond.notify_all()
+
+    def snapshot(self, limit=1000):
+        """Состояние очереди для отладки: счетчики и ключи (не более limit в каждом списке)"""
+        now = time.monotonic()
+        with self._cond:
+            waiting = sorted((ready_at, key) for key, ready_at in self._waiting_keys.items())
+            failures = sorted(self._failures.items(), key=lambda item: -item[1])
+            return {
+                "queued": len(self._queue),
+                "processing": len(self._processing),
+                "waiting": len(waiting),
+                "queued_keys": list(itertools.islice(self._queue, limit)),
+                "processing_keys": sorted(self._processing)[:limit],
+                "waiting_keys": [
+                    {"key": key, "in_seconds": round(ready_at - now, 3)} for ready_at, key in waiting[:limit]
+                ],
+                "failures": dict(failures[:limit]),
+            }
+
+
+class WorkerPool:
+    """Пул потоков, разбирающих очередь: handler(key) для каждого ключа.
+
+    Исключение в handler возвращает ключ в очередь с backoff.
+    """
+
+    def __init__(self, queue, handler, workers=4, name="reconcile"):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.name = name
+        self._threads = []
+
+    def _worker(self):
+        while True:
+            key = self.queue.get()
+            if key is None:
+                return
+            try:
+                self.handler(key)
+                self.queue.forget(key)
+            except Exception as e:
+                logger.error(f"Error processing {key}, retry #{self.queue.num_requeues(key) + 1}: {e}")
+                self.queue.add_rate_limited(key)
+            finally:
+                self.queue.done(key)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self.queue.shutdown()
+        for thread in self._threads:
+            thread.join()